@@ -0,0 +1,346 @@
+"""
+Display, input, audio and clock backends for the experiment.
+
+A backend is a namespace with the same module names experiment_utils uses
+(visual, event, core, sound, keyboard, screeninfo) plus a few hooks
+(preload_fonts, configure_audio). The "psychopy" backend is
+the real thing; the "headless" backend implements the small subset of the
+PsychoPy API the experiment needs on top of a virtual clock, so a whole session
+runs in fast-forward without a display (e.g. on CI machines).
+"""
+import importlib
+import math
+from types import SimpleNamespace
+
+
+def load_backend(name="psychopy", **options):
+    """Return the backend called name ("psychopy" or "headless")."""
+    if name == "psychopy":
+        return psychopy_backend()
+    if name == "headless":
+        return headless_backend(**options)
+    raise ValueError(f"Unknown backend: {name!r}")
+
+
+def psychopy_backend():
+    """
+    The real PsychoPy modules plus screeninfo.
+    Each module is only imported the first time it is used, so selecting the
+    backend is free and e.g. the audio stack can be loaded on another thread.
+    """
+    return SimpleNamespace(name="psychopy",
+                           visual=LazyModule("psychopy.visual"),
+                           event=LazyModule("psychopy.event"),
+                           core=LazyModule("psychopy.core"),
+                           sound=LazyModule("psychopy.sound"),
+                           keyboard=LazyModule("psychopy.hardware.keyboard"),
+                           screeninfo=LazyModule("screeninfo"),
+                           preload_fonts=_preload_system_fonts,
+                           configure_audio=_configure_ptb_audio)
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def _preload_system_fonts(names):
+    """Warm PsychoPy's system font lookup for the given font names."""
+    from psychopy.tools import fontmanager
+    manager = fontmanager.FontManager()
+    for name in names:
+        manager.getFontsMatching(name)
+
+
+def _configure_ptb_audio(latency_mode):
+    """
+    Select the psychtoolbox audio library in the given latency mode.
+    Must run before psychopy.sound is first imported.
+    """
+    from psychopy import prefs
+    prefs.hardware["audioLib"] = ["ptb"]
+    prefs.hardware["audioLatencyMode"] = latency_mode
+
+
+def headless_backend(keys=None, frame_rate=60.0, screen_size=(1920, 1080)):
+    """
+    A display-less backend running on a virtual clock.
+
+    keys is a list of scripted key presses as (delay, key) pairs. Each time the
+    experiment starts waiting for input the next pair is armed and the key is
+    "pressed" delay virtual seconds later. Once the script runs out, waitKeys
+    presses its first allowed key immediately (so does event.getKeys), the
+    keyboard's getKeys never returns anything (every trial runs to its timeout)
+    and waits with a maxWait time out instead.
+    """
+    clock = VirtualClock()
+    keyboard_input = ScriptedInput(clock, keys)
+    core = SimpleNamespace(
+        Clock=lambda: HeadlessClock(clock),
+        monotonicClock=HeadlessClock(clock),
+        getTime=clock.getTime,
+        wait=clock.wait,
+        quit=_quit,
+    )
+    visual = SimpleNamespace(
+        Window=lambda *args, **kwargs: HeadlessWindow(clock, frame_rate, *args, **kwargs),
+        TextStim=HeadlessStim,
+        Circle=HeadlessStim,
+        Rect=HeadlessStim,
+        ShapeStim=HeadlessStim,
+    )
+    event = SimpleNamespace(
+        waitKeys=keyboard_input.waitKeys,
+        getKeys=keyboard_input.getKeyNames,
+        clearEvents=keyboard_input.clearEvents,
+    )
+    sound = SimpleNamespace(Sound=lambda *args, **kwargs: HeadlessSound(clock, *args, **kwargs))
+    keyboard = SimpleNamespace(Keyboard=lambda *args, **kwargs: HeadlessKeyboard(clock, keyboard_input))
+    width, height = screen_size
+    screeninfo = SimpleNamespace(get_monitors=lambda: [SimpleNamespace(width=width, height=height)])
+    return SimpleNamespace(name="headless", visual=visual, event=event, core=core, sound=sound,
+                           keyboard=keyboard, screeninfo=screeninfo, preload_fonts=lambda names: None,
+                           configure_audio=lambda latency_mode: None, clock=clock, input=keyboard_input)
+
+
+def typed_keys(words, interval=0.15, pause=1.0):
+    """
+    Key script typing each of words (letter by letter, interval apart) and
+    pressing RETURN after it, with pause before the next word. Prepend the keys
+    that lead up to the recall, e.g. keys=[(0.5, "space")] + typed_keys(["melara"]).
+    """
+    keys = []
+    for word in words:
+        keys += [(pause if i == 0 else interval, letter) for i, letter in enumerate(word)]
+        keys.append((interval, "return"))
+    return keys
+
+
+def _quit():
+    # Same contract as psychopy.core.quit: never returns
+    raise SystemExit(0)
+
+
+# === CLOCK ===
+
+class VirtualClock:
+    """Session time that only moves when the experiment waits or flips."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def getTime(self):
+        return self.now
+
+    def wait(self, secs, hogCPUperiod=None):
+        if secs > 0:
+            # A wait too short to change the float still moves time on, as it would in reality
+            self.now = max(self.now + secs, math.nextafter(self.now, math.inf))
+
+    def advance_to(self, t):
+        if t > self.now:
+            self.now = t
+
+
+class HeadlessClock:
+    """core.Clock on top of the virtual clock."""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._reset_time = clock.now
+
+    def getTime(self):
+        return self._clock.now - self._reset_time
+
+    def reset(self, newT=0.0):
+        self._reset_time = self._clock.now + newT
+
+    def getLastResetTime(self):
+        return self._reset_time
+
+
+# === DISPLAY ===
+
+class HeadlessWindow:
+    """A window whose flips advance the virtual clock to the next refresh."""
+
+    def __init__(self, clock, frame_rate, size=(800, 600), **kwargs):
+        self._clock = clock
+        self.size = size
+        self.monitorFramePeriod = 1.0 / frame_rate
+        self.winHandle = SimpleNamespace(set_fullscreen=lambda fullscreen: None, maximize=lambda: None)
+        self.frames = 0
+        self._on_flip = []
+
+    def getActualFrameRate(self, **kwargs):
+        return 1.0 / self.monitorFramePeriod
+
+    def getFutureFlipTime(self, targetTime=0, clock=None):
+        """Time of the first refresh at least targetTime from now (virtual clock)."""
+        period = self.monitorFramePeriod
+        return (math.floor((self._clock.now + targetTime) / period + 1e-9) + 1) * period
+
+    def callOnFlip(self, function, *args, **kwargs):
+        self._on_flip.append((function, args, kwargs))
+
+    def flip(self, clearBuffer=True):
+        # Land on the next refresh boundary, like a vsynced swap
+        period = self.monitorFramePeriod
+        self._clock.now = (math.floor(self._clock.now / period + 1e-9) + 1) * period
+        self.frames += 1
+        for function, args, kwargs in self._on_flip:
+            function(*args, **kwargs)
+        self._on_flip = []
+        return self._clock.now
+
+    def clearBuffer(self, color=True, depth=False, stencil=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class HeadlessStim:
+    """Stand-in for any visual stimulus: keeps its attributes, draws nothing."""
+
+    def __init__(self, win, text="", pos=(0, 0), height=0, **kwargs):
+        self.win = win
+        self.text = text
+        self.pos = pos
+        self.height = height
+        self.boundingBox = (int(len(text) * height * 0.6), int(height))
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def draw(self, win=None):
+        pass
+
+
+# === AUDIO ===
+
+class HeadlessSound:
+    """sound.Sound that counts how often it was played and starts exactly when asked."""
+
+    def __init__(self, clock, value="C", secs=0.5, volume=1.0, **kwargs):
+        self._clock = clock
+        self.value = value
+        self.secs = secs
+        self.volume = volume
+        self.plays = 0
+        self.statusDetailed = {"StartTime": 0.0}
+
+    def play(self, when=None, **kwargs):
+        self.plays += 1
+        self.statusDetailed = {"StartTime": self._clock.now if when is None else when}
+
+    def setVolume(self, volume):
+        self.volume = volume
+
+    def stop(self):
+        pass
+
+
+# === INPUT ===
+
+class KeyPress:
+    """Subset of psychopy.hardware.keyboard.KeyPress."""
+
+    def __init__(self, name, tDown, rt):
+        self.name = name
+        self.tDown = tDown
+        self.rt = rt
+        self.duration = None
+
+
+class ScriptedInput:
+    """Key presses from a script of (delay, key) pairs, timed on the virtual clock."""
+
+    def __init__(self, clock, keys=None):
+        self._clock = clock
+        self._script = list(keys or [])
+        self._script.reverse()  # pop() from the end
+        self._pending = None
+
+    def _arm(self):
+        if self._pending is None and self._script:
+            delay, name = self._script.pop()
+            self._pending = (self._clock.now + delay, name)
+
+    def poll(self, keyList=None):
+        """Return [(tDown, name)] for a scripted press that is due and allowed."""
+        self._arm()
+        if self._pending is None:
+            return []
+        t_down, name = self._pending
+        if t_down > self._clock.now or (keyList is not None and name not in keyList):
+            return []
+        self._pending = None
+        return [(t_down, name)]
+
+    def waitKeys(self, maxWait=float("inf"), keyList=None, timeStamped=False, **kwargs):
+        """
+        Advance to the next scripted press. With maxWait, time out (returning None)
+        if no allowed press is due by then; without, press the first allowed key
+        once the script has run out. With timeStamped (True or a clock) returns
+        [(name, time)] pairs like psychopy.event.waitKeys.
+        """
+        self._arm()
+        deadline = self._clock.now + maxWait
+        if self._pending is not None and (keyList is None or self._pending[1] in keyList):
+            if self._pending[0] <= deadline:
+                self._clock.advance_to(self._pending[0])
+                name = self._pending[1]
+                self._pending = None
+                return self._stamp([name], timeStamped)
+        if maxWait != float("inf"):
+            self._clock.advance_to(deadline)
+            return None
+        return self._stamp([keyList[0] if keyList else "space"], timeStamped)
+
+    def _stamp(self, names, timeStamped):
+        if timeStamped is False:
+            return names
+        t = self._clock.now if timeStamped is True else timeStamped.getTime()
+        return [(name, t) for name in names]
+
+    def getKeyNames(self, keyList=None, **kwargs):
+        """
+        Names of the scripted presses that are due. Once the script has run out
+        the first allowed key is pressed, as with waitKeys, so screens polling
+        for a key move on.
+        """
+        self._arm()
+        if self._pending is None:
+            return [keyList[0] if keyList else "space"]
+        return [name for t_down, name in self.poll(keyList)]
+
+    def clearEvents(self, eventType=None):
+        # Presses that already happened are discarded, scheduled ones stay
+        if self._pending is not None and self._pending[0] <= self._clock.now:
+            self._pending = None
+
+
+class HeadlessKeyboard:
+    """psychopy.hardware.keyboard.Keyboard driven by ScriptedInput."""
+
+    def __init__(self, clock, keyboard_input):
+        self.clock = HeadlessClock(clock)
+        self._input = keyboard_input
+
+    def getKeys(self, keyList=None, waitRelease=True, clear=True):
+        reset_time = self.clock.getLastResetTime()
+        return [KeyPress(name, t_down, t_down - reset_time) for t_down, name in self._input.poll(keyList)]
+
+    def clearEvents(self, eventType=None):
+        self._input.clearEvents(eventType)
@@ -0,0 +1,318 @@
+"""
+Benchmarks of the experiment loops, session startup and the analysis.
+
+The experiment benchmarks run on a real, hidden PsychoPy window when PsychoPy
+and a display are available (the draw, flip and keyboard costs are real), and
+on the headless backend otherwise. The headless stimuli draw nothing and its
+virtual clock skips every wait, so there they only measure the Python overhead
+of the loops; the backend is recorded with the results and a baseline from the
+other backend is not compared against.
+
+- draw_flip:      wall time to draw a word screen and flip without waiting for
+                  the vertical blank (PsychoPy window only)
+- trial_loop:     per word trial of run_experiment: CPU time on a PsychoPy window
+                  (drawing, flipping and keyboard polling), wall time headless
+- stimulus_cache: cost of building the TextStims of a session, per stimulus
+- filler_cpu:     CPU seconds per second of the filler task
+- startup:        import + device startup of a fresh interpreter, in ms (headless)
+- analysis_<n>:   participants per second through the analysis of data_analysis
+                  (store query, recall scoring, round and participant summaries)
+                  on generated datasets of n participants
+
+Each benchmark reports the best of several repeats to keep the noise down.
+Results are written as JSON. With a saved baseline every metric that got worse
+by more than the tolerance is flagged as a regression.
+
+    python benchmarks.py                   # run, compare with benchmark_baseline.json
+    python benchmarks.py --quick           # small analysis datasets only
+    python benchmarks.py --headless        # experiment benchmarks on the headless backend
+    python benchmarks.py --save-baseline   # run and store the results as the new baseline
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+RESULTS_PATH = "benchmark_results.json"
+BASELINE_PATH = "benchmark_baseline.json"
+ANALYSIS_SIZES = (10, 1_000, 100_000)
+QUICK_ANALYSIS_SIZES = (10, 1_000)
+TOLERANCE = 0.2  # 20 % slower than the baseline counts as a regression
+REPEATS = 5
+WINDOW_SIZE = (1280, 720)
+# Metrics that depend on the backend the experiment benchmarks ran on
+BACKEND_METRICS = {"draw_flip", "trial_loop", "stimulus_cache", "filler_cpu"}
+
+
+def _metric(value, unit, better="lower"):
+    return {"value": round(float(value), 6), "unit": unit, "better": better}
+
+
+def display_backend():
+    """"psychopy" if PsychoPy is installed and there is a display to open a window on, else "headless"."""
+    try:
+        import psychopy  # noqa: F401
+    except ImportError:
+        return "headless"
+    if sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+        return "headless"
+    return "psychopy"
+
+
+def _open_window(eu, backend):
+    """The session's window headless; on PsychoPy a hidden window that does not wait for the vertical blank."""
+    if backend == "headless":
+        return eu.initialize_screen()
+    win = eu.visual.Window(size=WINDOW_SIZE, fullscr=False, units="pix", color="black", waitBlanking=False,
+                           checkTiming=False)
+    try:
+        win.winHandle.set_visible(False)  # pyglet: still renders into the back buffer
+    except AttributeError:
+        pass
+    return win
+
+
+def _best_of(function, backend="headless", repeats=REPEATS):
+    """
+    Smallest result of repeats calls of function(experiment_utils, win), each on a
+    fresh backend and window; function returns the duration of its timed part.
+    """
+    import experiment_utils
+
+    results = []
+    for _ in range(repeats):
+        experiment_utils.use_backend(backend)
+        win = _open_window(experiment_utils, backend)
+        try:
+            results.append(function(experiment_utils, win))
+        finally:
+            if backend != "headless":
+                win.close()
+    return min(results)
+
+
+# === EXPERIMENT BENCHMARKS ===
+
+def bench_draw_flip(backend, n_frames=600):
+    """Wall time per frame of drawing a word with its instruction and flipping."""
+    def run(eu, win):
+        stimuli = eu.StimulusCache(win).build({"mirrored": "Write mirrored the word"}, [["tavira"]])
+        stims = [stimuli.instructions["mirrored"], stimuli.words["tavira"], stimuli.hint]
+        start = time.perf_counter()
+        for _ in range(n_frames):
+            for stim in stims:
+                stim.draw()
+            win.flip()
+        return time.perf_counter() - start
+
+    return _metric(_best_of(run, backend) / n_frames * 1000, "ms/frame")
+
+
+def bench_trial_loop(backend, n_trials=None):
+    """Per trial of run_experiment; every trial runs to its timeout."""
+    headless = backend == "headless"
+    n_trials = n_trials or (200 if headless else 20)
+    time_per_word = 2.0 if headless else 0.2
+    words = [f"word{i}" for i in range(n_trials)]
+    measure = time.perf_counter if headless else time.process_time
+
+    def run(eu, win):
+        beep, kb = eu.initialize_beep(), eu.initialize_keyboard()
+        stimuli = eu.StimulusCache(win).build({"normal": "Write normally the word"}, [words])
+        start = measure()
+        eu.run_experiment(win, beep, kb, "normal", words, (time_per_word, 0.5 if headless else 0, 0, 0), stimuli)
+        return measure() - start
+
+    return _metric(_best_of(run, backend, REPEATS if headless else 3) / n_trials * 1000,
+                   "ms/trial" if headless else "cpu ms/trial")
+
+
+def bench_stimulus_cache(backend, n_words=2_000):
+    words = [f"word{i}" for i in range(n_words)]
+    instructions = {"normal": "Write normally the word", "mirrored": "Write mirrored the word"}
+
+    def run(eu, win):
+        start = time.perf_counter()
+        eu.StimulusCache(win).build(instructions, [words])
+        return time.perf_counter() - start
+
+    return _metric(_best_of(run, backend) / n_words * 1e6, "us/stimulus")
+
+
+def bench_filler_cpu(backend, seconds=None):
+    """CPU seconds per second of the filler task (virtual seconds headless)."""
+    seconds = seconds or (120 if backend == "headless" else 10)
+
+    def run(eu, win):
+        kb = eu.initialize_keyboard()
+        start = time.process_time()
+        eu.run_filler_task(win, kb, seconds, seed=1)
+        return time.process_time() - start
+
+    return _metric(_best_of(run, backend, REPEATS if backend == "headless" else 3) / seconds * 1000, "cpu ms/s")
+
+
+def bench_startup(repeats=REPEATS):
+    """Best of repeats: import experiment_utils and start the headless devices in a fresh interpreter."""
+    code = ("import time; t = time.perf_counter(); import experiment_utils as eu; "
+            "eu.use_backend('headless'); eu.initialize_devices(eu.StartupTimer(t)); "
+            "print((time.perf_counter() - t) * 1000)")
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = [float(subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True,
+                                  check=True).stdout.split()[-1])
+             for _ in range(repeats)]
+    return _metric(min(times), "ms")
+
+
+# === ANALYSIS BENCHMARKS ===
+
+def generate_dataset(n_participants, seed=0, recall_rate=0.4, typo_rate=0.1, intrusion_rate=0.1):
+    """
+    Synthetic trials and responses tables (as returned by ResultsStore.trials/responses)
+    for n_participants, using the compiled schedules of stimulus_bank.
+    """
+    import pandas as pd
+    from stimulus_bank import CONDITIONS, compile_schedules, load_bank
+
+    rng = np.random.default_rng(seed)
+    here = os.path.dirname(os.path.abspath(__file__))
+    bank = load_bank(os.path.join(here, "wordlist_gpt_nonsense.txt"))
+    schedule = compile_schedules(bank, n_participants)
+    n, n_rounds, n_words = schedule.words.shape
+
+    participants = np.repeat(np.arange(1, n + 1), n_rounds * n_words)
+    rounds = np.tile(np.repeat(np.arange(1, n_rounds + 1), n_words), n)
+    word_index = schedule.words.reshape(-1)
+    skipped = rng.random(word_index.size) < 0.8
+    trials = pd.DataFrame({
+        "participant": participants,
+        "round": rounds,
+        "trial": np.tile(np.arange(1, n_words + 1), n * n_rounds),
+        "word": bank.lookup(word_index),
+        "condition": np.asarray(CONDITIONS, dtype=object)[np.repeat(schedule.conditions.reshape(-1), n_words)],
+        "skipped": skipped,
+        "time_spent": np.where(skipped, rng.gamma(2.0, 4.0, word_index.size).clip(0, 28), 28.0).round(3),
+        "onset": np.nan,
+    })
+
+    # Recalled words, some misspelled (one letter swapped for "x"), plus intrusions from the bank
+    recalled = rng.random(word_index.size) < recall_rate
+    responses = trials.loc[recalled, ["participant", "round", "word"]].rename(columns={"word": "response"})
+    typos = rng.random(len(responses)) < typo_rate
+    responses.loc[typos, "response"] = [word[:-1] + "x" for word in responses.loc[typos, "response"]]
+    n_intrusions = int(n * n_rounds * intrusion_rate)
+    intrusions = pd.DataFrame({
+        "participant": rng.integers(1, n + 1, n_intrusions),
+        "round": rng.integers(1, n_rounds + 1, n_intrusions),
+        "response": bank.lookup(rng.integers(0, len(bank), n_intrusions)),
+    })
+    responses = pd.concat([responses, intrusions], ignore_index=True).sort_values(
+        ["participant", "round"], kind="stable")
+    responses["position"] = responses.groupby(["participant", "round"]).cumcount() + 1
+    return trials, responses[["participant", "round", "position", "response"]].reset_index(drop=True)
+
+
+def bench_analysis(n_participants, seed=0, repeats=None):
+    """Participants per second from store query to participants_summary (best of repeats)."""
+    from data_analysis import summarize_participants, summarize_rounds
+    from recall_scoring import count_categories, score_responses
+    from results_store import ResultsStore
+
+    trials, responses = generate_dataset(n_participants, seed)
+    with tempfile.TemporaryDirectory() as directory:
+        with ResultsStore(os.path.join(directory, "results.sqlite")) as store:
+            trials.to_sql("trials", store.connection, if_exists="append", index=False)
+            responses.to_sql("responses", store.connection, if_exists="append", index=False)
+            store.connection.executemany("INSERT INTO participants (participant, recall_complete) VALUES (?, 1)",
+                                         [(int(p),) for p in range(1, n_participants + 1)])
+            store.connection.commit()
+
+            times = []
+            # Large datasets are slow enough to time once
+            for _ in range(repeats or (REPEATS if n_participants <= 1_000 else 1)):
+                start = time.perf_counter()
+                trials = store.trials(complete_only=True)
+                responses = store.responses(complete_only=True)
+                scored = score_responses(trials, responses)
+                summarize_participants(summarize_rounds(trials, count_categories(scored)))
+                times.append(time.perf_counter() - start)
+    return _metric(n_participants / min(times), "participants/s", better="higher")
+
+
+# === RUNNING AND COMPARING ===
+
+def run_all(analysis_sizes=ANALYSIS_SIZES, backend="headless"):
+    benchmarks = {
+        "trial_loop": lambda: bench_trial_loop(backend),
+        "stimulus_cache": lambda: bench_stimulus_cache(backend),
+        "filler_cpu": lambda: bench_filler_cpu(backend),
+        "startup": bench_startup,
+    }
+    if backend != "headless":
+        benchmarks = {"draw_flip": lambda: bench_draw_flip(backend), **benchmarks}
+    for size in analysis_sizes:
+        benchmarks[f"analysis_{size}"] = lambda size=size: bench_analysis(size)
+
+    metrics = {}
+    for name, benchmark in benchmarks.items():
+        metrics[name] = benchmark()
+        print(f"  {name:<20}{metrics[name]['value']:>14.3f} {metrics[name]['unit']}")
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "backend": backend,
+        "metrics": metrics,
+    }
+
+
+def find_regressions(results, baseline, tolerance=TOLERANCE):
+    """
+    (name, baseline value, current value) of every metric worse than the baseline by more than tolerance.
+    The experiment metrics are only compared when both runs used the same backend.
+    """
+    same_backend = results.get("backend", "headless") == baseline.get("backend", "headless")
+    regressions = []
+    for name, metric in results["metrics"].items():
+        reference = baseline.get("metrics", {}).get(name)
+        if reference is None or not reference["value"]:
+            continue
+        if name in BACKEND_METRICS and not same_backend:
+            continue
+        change = metric["value"] / reference["value"] - 1
+        if metric["better"] == "higher":
+            change = -change
+        if change > tolerance:
+            regressions.append((name, reference["value"], metric["value"]))
+    return regressions
+
+
+if __name__ == '__main__':
+    sizes = QUICK_ANALYSIS_SIZES if "--quick" in sys.argv else ANALYSIS_SIZES
+    backend = "headless" if "--headless" in sys.argv else display_backend()
+    print(f"Benchmarks ({backend} backend):")
+    results = run_all(sizes, backend)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if "--save-baseline" in sys.argv:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("backend", "headless") != backend:
+            print(f"Baseline was run on the {baseline.get('backend', 'headless')} backend: "
+                  f"experiment benchmarks not compared")
+        regressions = find_regressions(results, baseline)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before} -> {after}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {BASELINE_PATH}")
@@ -1,48 +1,247 @@
+import hashlib
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import pandas as pd
 
-def generate_rounds_data(results_df, round_df, round_number, rounds):
-    condition = round_df["condition"].iloc[0]  # same for all rows in the round
-    # Total time spent in the round
-    total_time = round_df["time_spent"].sum()
-    recalled_words = []
-    for word in results_df[f'round{round_number}']:
-        if type(word) == str:
-            recalled_words.append(word)
-    rounds['round'].append(round_number)
-    rounds['condition'].append(condition)
-    rounds['total_time'].append(round(total_time, 2))
-    rounds['total_words'].append(len(recalled_words))
-    #print(rounds)
-    return rounds
+from inference import summarize_effects
+from recall_scoring import count_categories, score_responses
+from reports import write_cohort_report, write_participant_reports
+from results_store import STORE_PATH, ResultsStore
 
-if __name__ == '__main__':
-    number_of_participants = 6
-    participants_data = {'participant': [], 'avg_words_normal':[], 'avg_words_mirrored':[], 'avg_normal_time(s)': [], 'avg_mirrored_time(s)': []} 
-    for participant in range(1,number_of_participants + 1):
-        rounds = {'round': [], 'condition': [], 'total_time': [], 'total_words': []}
-        #results_df = pd.read_excel(f"participants_results\participant_{participant}\participant_{participant}_results.xlsx")
-        results_df = pd.read_excel(f"participants_results/participant_{participant}/participant_{participant}_results.xlsx")
-
-        for round_number in range(1,7):
-            round_df = pd.read_csv(f"participants_results/participant_{participant}/round_{round_number}.csv")
-
-            rounds = generate_rounds_data(results_df, round_df, round_number, rounds)
-        rounds_df = pd.DataFrame(rounds)
-        participants_data['participant'].append(participant)
-        avg_normal = rounds_df[rounds_df['condition']=='normal']['total_words'].mean()
-        avg_mirrored = rounds_df[rounds_df['condition']=='mirrored']['total_words'].mean()
-        avg_normal_time = rounds_df[rounds_df['condition']=='normal']['total_time'].mean()
-        avg_mirrored_time = rounds_df[rounds_df['condition']=='mirrored']['total_time'].mean()
-        participants_data['avg_words_normal'].append(round(avg_normal,2))
-        participants_data['avg_words_mirrored'].append(round(avg_mirrored,2))
-        participants_data['avg_normal_time(s)'].append(round(avg_normal_time, 2))
-        participants_data['avg_mirrored_time(s)'].append(round(avg_mirrored_time, 2))
-        # save rounds data in the participant folder
-        rounds_df.to_csv(fr'participants_results/participant_{participant}/participant_{participant}_rounds_summary.csv', index=False)
-
-    participants_df = pd.DataFrame(participants_data)
+RESULTS_DIR = "participants_results"
+CACHE_DIR = os.path.join(RESULTS_DIR, ".analysis_cache")
+NUMBER_OF_ROUNDS = 6
+INFERENCE_SEED = 2024  # fixed, so the inference results (and the cohort report) only change with the data
+ROUND_COLUMNS = [f"round{round_number}" for round_number in range(1, NUMBER_OF_ROUNDS + 1)]
+
+
+# === INGESTION ===
+
+def recall_files(participant, results_dir=RESULTS_DIR):
+    """
+    The recall input files of a participant: recall_round_1..6.csv if the recall
+    was typed in during the session, else the transcribed results workbook.
+    """
+    folder = os.path.join(results_dir, f"participant_{participant}")
+    typed = [os.path.join(folder, f"recall_round_{round_number}.csv")
+             for round_number in range(1, NUMBER_OF_ROUNDS + 1)]
+    if os.path.exists(typed[-1]):
+        return typed
+    return [os.path.join(folder, f"participant_{participant}_results.xlsx")]
+
+
+def discover_participants(results_dir=RESULTS_DIR):
+    """
+    Return the sorted participant numbers in results_dir.
+    Folders without a complete recall yet (session still running, or the
+    workbook not transcribed) are skipped.
+    """
+    participants = []
+    with os.scandir(results_dir) as entries:
+        for entry in entries:
+            match = re.fullmatch(r"participant_(\d+)", entry.name)
+            if match and os.path.exists(recall_files(int(match.group(1)), results_dir)[-1]):
+                participants.append(int(match.group(1)))
+    return sorted(participants)
+
+
+def cached_read(path, reader, cache_dir=CACHE_DIR):
+    """
+    Parse path with reader, caching the resulting DataFrame as a pickle.
+    The cache key is the file's path, size and mtime, so a file is only parsed
+    again after it changed.
+    """
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    cache_path = os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+    if os.path.exists(cache_path):
+        return pd.read_pickle(cache_path)
+    df = reader(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+    return df
+
+
+def load_participant(participant, results_dir=RESULTS_DIR, cache_dir=CACHE_DIR):
+    """
+    Load the recall (typed recall files or workbook) and the round files of one
+    participant. Returns (participant, responses, trials): the recall responses
+    as a long table (round, response) and the six round files stacked with round
+    and trial columns, so the reshaping is done in the worker processes.
+    """
+    folder = os.path.join(results_dir, f"participant_{participant}")
+    paths = recall_files(participant, results_dir)
+    if len(paths) == 1:
+        results_df = cached_read(paths[0], pd.read_excel, cache_dir)
+    else:
+        # Typed recall: one file per round with a response per row (a typed "nan" is a word too)
+        typed = [cached_read(path, partial(pd.read_csv, keep_default_na=False), cache_dir)["response"]
+                 for path in paths]
+        results_df = pd.concat(typed, axis=1, keys=ROUND_COLUMNS)
+    round_dfs = [cached_read(os.path.join(folder, f"round_{round_number}.csv"), pd.read_csv, cache_dir)
+                 for round_number in range(1, NUMBER_OF_ROUNDS + 1)]
+
+    trials = pd.concat(round_dfs, keys=range(1, NUMBER_OF_ROUNDS + 1), names=["round", "trial"])
+    trials = trials.reindex(columns=["word", "condition", "skipped", "time_spent", "onset"]).reset_index()
+    trials["trial"] += 1
+
+    responses = results_df.reindex(columns=ROUND_COLUMNS)
+    responses.columns = range(1, NUMBER_OF_ROUNDS + 1)
+    responses = responses.melt(var_name="round", value_name="response").dropna(subset=["response"])
+    return participant, responses, trials
+
+
+def load_all_participants(results_dir=RESULTS_DIR, cache_dir=CACHE_DIR, workers=None, participants=None):
+    """
+    Load every participant found in results_dir (or only the given participants)
+    across a process pool.
+    Returns a list of (participant, responses, trials) in participant order.
+    """
+    if participants is None:
+        participants = discover_participants(results_dir)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(participants) <= 1:
+        return [load_participant(participant, results_dir, cache_dir) for participant in participants]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(load_participant, participants,
+                             [results_dir] * len(participants), [cache_dir] * len(participants),
+                             chunksize=max(1, len(participants) // (4 * workers))))
+
+
+def participant_signature(participant, results_dir=RESULTS_DIR):
+    """Size and mtime of all input files of a participant, to detect changes."""
+    folder = os.path.join(results_dir, f"participant_{participant}")
+    paths = recall_files(participant, results_dir)
+    paths += [os.path.join(folder, f"round_{round_number}.csv") for round_number in range(1, NUMBER_OF_ROUNDS + 1)]
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def import_results_tree(store, results_dir=RESULTS_DIR, cache_dir=CACHE_DIR, workers=None):
+    """
+    Import participant folders into the results store.
+    Only participants that are new or whose files changed since their last
+    import are parsed. Participants numbered by a results_collector are never
+    replaced by a folder: their number may belong to another station's
+    participant. Returns the imported participant numbers.
+    """
+    if not os.path.isdir(results_dir):
+        return []
+    known = store.import_signatures()
+    collected = store.collected_participants()
+    participants = discover_participants(results_dir)
+    skipped = [participant for participant in participants if participant in collected]
+    if skipped:
+        print(f"Not importing the folders of participants numbered by the collector: {skipped}")
+    signatures = {participant: participant_signature(participant, results_dir)
+                  for participant in participants if participant not in collected}
+    changed = [participant for participant, signature in signatures.items()
+               if known.get(participant) != signature]
+    for participant, responses, trials in load_all_participants(results_dir, cache_dir, workers, changed):
+        store.replace_participant(participant, trials, responses, signatures[participant])
+    return changed
+
+
+# === AGGREGATION ===
+
+def summarize_rounds(trials, recalled):
+    """
+    Per participant and round: condition, total time and the recall counts of
+    recall_scoring.count_categories (total_words = correctly recalled words).
+    """
+    rounds_df = (trials.groupby(["participant", "round"], observed=True, sort=True)
+                 .agg(condition=("condition", "first"), total_time=("time_spent", "sum"))
+                 .reset_index())
+    rounds_df["condition"] = rounds_df["condition"].astype(str)
+    rounds_df["total_time"] = rounds_df["total_time"].round(2)
+    rounds_df = rounds_df.merge(recalled.astype({"round": rounds_df["round"].dtype}),
+                                on=["participant", "round"], how="left")
+    count_columns = [column for column in recalled.columns if column not in ("participant", "round")]
+    rounds_df[count_columns] = rounds_df[count_columns].fillna(0).astype(int)
+    return rounds_df
+
+
+def summarize_participants(rounds_df):
+    """Per participant: mean recalled words and mean round time per condition."""
+    means = rounds_df.groupby(["participant", "condition"])[["total_words", "total_time"]].mean().unstack("condition")
+    means = means.reindex(columns=pd.MultiIndex.from_product([["total_words", "total_time"], ["normal", "mirrored"]]))
+    participants_df = pd.DataFrame({
+        "participant": means.index,
+        "avg_words_normal": means[("total_words", "normal")].to_numpy(),
+        "avg_words_mirrored": means[("total_words", "mirrored")].to_numpy(),
+        "avg_normal_time(s)": means[("total_time", "normal")].to_numpy(),
+        "avg_mirrored_time(s)": means[("total_time", "mirrored")].to_numpy(),
+    })
+    return participants_df.round(2)
+
+
+def with_folder(table, results_dir=RESULTS_DIR):
+    """
+    The rows of table whose participant has a folder in results_dir.
+    Participants received only through a results_collector have none.
+    """
+    participants = table["participant"].unique()
+    present = [participant for participant in participants
+               if os.path.isdir(os.path.join(results_dir, f"participant_{participant}"))]
+    return table[table["participant"].isin(present)]
+
+
+def write_rounds_summaries(rounds_df, results_dir=RESULTS_DIR):
+    """Save each participant's rounds in participant_N_rounds_summary.csv (participants with a folder only)."""
+    for participant, participant_rounds in with_folder(rounds_df, results_dir).groupby("participant"):
+        participant_rounds.drop(columns="participant").to_csv(
+            os.path.join(results_dir, f"participant_{participant}",
+                         f"participant_{participant}_rounds_summary.csv"), index=False)
+
+
+def main(store_path=STORE_PATH, results_dir=RESULTS_DIR, participant_reports=False):
+    """
+    The whole analysis: import the participant folders (if any) into the store,
+    score the recall, summarize rounds and participants, run the inference and
+    render the cohort report (and, with participant_reports, one report per
+    participant). The summary tables are written to the working directory.
+    """
+    with ResultsStore(store_path) as store:
+        # bring new or changed participant folders into the store, then query it
+        imported = import_results_tree(store, results_dir, os.path.join(results_dir, ".analysis_cache"))
+        print(f"Imported {len(imported)} new or changed participants into {store_path}")
+        trials = store.trials(complete_only=True)
+        responses = store.responses(complete_only=True)
+
+    # score every response against the presented words (correct, near-miss, intrusion, duplicate)
+    scored = score_responses(trials, responses)
+    scored.to_csv('recall_scoring.csv', index=False)
+    rounds_df = summarize_rounds(trials, count_categories(scored))
+    # save rounds data in the participant folders
+    write_rounds_summaries(rounds_df, results_dir)
+
+    participants_df = summarize_participants(rounds_df)
     participants_df.to_csv('participants_summary.csv', index=False)
-    participants_summary = pd.read_csv('participants_summary.csv')
-    print(participants_summary)
+    print(participants_df)
 
-        
\ No newline at end of file
+    # paired bootstrap CIs and permutation tests of mirrored - normal, on all cores
+    effects_df = pd.DataFrame(summarize_effects(participants_df, seed=INFERENCE_SEED, workers=None))
+    effects_df.to_csv('participants_inference.csv', index=False)
+    print(effects_df)
+
+    # per-participant reports (on request, only for participants with a folder whose data changed)
+    if participant_reports:
+        rendered = write_participant_reports(with_folder(trials, results_dir), with_folder(rounds_df, results_dir),
+                                             results_dir)
+        print(f"Rendered {len(rendered)} participant reports")
+    write_cohort_report(participants_df, effects_df, os.path.join(results_dir, "cohort_report"))
+    return participants_df, effects_df
+
+
+if __name__ == '__main__':
+    # python data_analysis.py [--reports]
+    main(participant_reports="--reports" in sys.argv)
@@ -1,11 +1,37 @@
 #from psychopy import prefs
 #prefs.hardware['audioLib'] = ['sounddevice']
-from psychopy import visual, event, core, sound
-import screeninfo
+import itertools
+import math
 import os
-import random
-import pandas as pd
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
 #import sounddevice as sd
+from backends import load_backend
+from frame_timing import FrameTimer
+from participant_allocator import allocate_participant
+from results_store import STORE_PATH, ResultsStore
+from session_log import SESSION_LOG, SessionLog, read_session
+from session_timeline import (BEEP_HOLD_TIME, FILLER_END_TIME, RECALL_BEEP_HOLD_TIME, RECALL_START_DELAY,
+                              compile_timeline)
+
+# PsychoPy-like modules of the active backend (see use_backend)
+visual = event = core = sound = keyboard = screeninfo = preload_fonts = configure_audio = None
+
+
+def use_backend(name="psychopy", **options):
+    """
+    Select the display, input, audio and clock backend used by all functions below.
+    "psychopy" is the real lab setup, "headless" runs on a virtual clock with
+    scripted key presses (see backends.headless_backend for the options).
+    """
+    global visual, event, core, sound, keyboard, screeninfo, preload_fonts, configure_audio
+    backend = load_backend(name, **options)
+    visual, event, core, sound = backend.visual, backend.event, backend.core, backend.sound
+    keyboard, screeninfo = backend.keyboard, backend.screeninfo
+    preload_fonts, configure_audio = backend.preload_fonts, backend.configure_audio
+    return backend
 
 # === INITIALIZATION FUNCTIONS ===
 def initialize_screen():
@@ -26,13 +52,122 @@ def initialize_screen():
     return win
 
 
+# Audio output: psychtoolbox in aggressive low-latency mode (3) with 128-sample
+# blocks (~3 ms at 44.1 kHz)
+AUDIO_LATENCY_MODE = 3
+AUDIO_BLOCK_SIZE = 128
+
+
 def initialize_beep():
-    """Return a pleasant beep sound routed to the active default output device."""
+    """
+    Return a pleasant beep sound routed to the active default output device.
+    The output stream is opened here, once, and the whole tone is pre-buffered
+    so a later play() only has to start it.
+    """
+    configure_audio(AUDIO_LATENCY_MODE)
 
     # Create the beep sound (pleasant C tone)
-    beep = sound.Sound(value='C', secs=0.3, stereo=True, sampleRate=44100)
+    beep = sound.Sound(value='C', secs=0.3, stereo=True, sampleRate=44100,
+                       blockSize=AUDIO_BLOCK_SIZE, preBuffer=-1)
     return beep
 
+def initialize_keyboard():
+    """
+    Return a background keyboard.
+    With psychtoolbox installed key presses carry hardware timestamps.
+    """
+    return keyboard.Keyboard()
+
+# === STARTUP ===
+
+# Fonts used by the experiment's text stimuli
+FONTS = ["Arial"]
+
+
+class StartupTimer:
+    """Wall-clock duration of each startup stage, printed as a breakdown."""
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def add(self, name, secs):
+        self.stages.append((name, secs))
+
+    def report(self):
+        lines = ["Startup timing:"]
+        for name, secs in self.stages:
+            lines.append(f"  {name:<32}{secs * 1000:9.1f} ms")
+        lines.append(f"  {'total':<32}{(time.perf_counter() - self.origin) * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+
+def initialize_devices(timer):
+    """
+    Create the window while the audio device and the fonts load in the background.
+    The window stays on the main thread (required by the GUI toolkit); the beep is
+    returned once both background loaders are done. Returns (win, beep).
+    """
+    loaded = {}
+    errors = []
+
+    def load_audio():
+        try:
+            with timer.stage("audio device + beep (background)"):
+                loaded["beep"] = initialize_beep()
+        except Exception as error:
+            errors.append(error)
+
+    def load_fonts():
+        try:
+            with timer.stage("fonts (background)"):
+                preload_fonts(FONTS)
+        except Exception:
+            pass  # only a warm-up, TextStim will find the fonts itself
+
+    with timer.stage("import display"):
+        visual.Window  # resolves the lazy import before the loaders start importing too
+    loaders = [threading.Thread(target=load_audio, daemon=True),
+               threading.Thread(target=load_fonts, daemon=True)]
+    for loader in loaders:
+        loader.start()
+
+    with timer.stage("window"):
+        win = initialize_screen()
+
+    with timer.stage("wait for background loaders"):
+        for loader in loaders:
+            loader.join()
+    if errors:
+        raise errors[0]
+    return win, loaded["beep"]
+
+
+def preload_results_modules(timer):
+    """
+    Import pandas (which writes the results) on a background thread, so the import
+    does not land in the middle of the first round. Returns the thread.
+    """
+    def load():
+        try:
+            with timer.stage("pandas (background)"):
+                import pandas  # noqa: F401
+        except ImportError:
+            pass  # only a warm-up, the first results write reports it
+
+    loader = threading.Thread(target=load, daemon=True)
+    loader.start()
+    return loader
+
+
 def create_main_folder():
     """Ensure results folder exists."""
     os.makedirs("participants_results", exist_ok=True)
@@ -40,228 +175,352 @@ def create_main_folder():
 def create_participant_folder():
     """
     Creates a new folder for the next participant inside 'participants_results'.
+    The ID is allocated atomically, so several stations can share the folder.
     Returns the folder path and participant number.
     """
-    participant_num = 1
-    # Find the next available participant number
-    while os.path.exists(f"participants_results/participant_{participant_num}"):
-        participant_num += 1
-
-    participant_folder = f"participants_results/participant_{participant_num}"
-    os.makedirs(participant_folder)
-    return participant_folder, participant_num
-
-def get_word_sets(number_of_words=5, number_of_list=6):
-    """Generate two unique word lists (round 1 & round 2)."""
-    #random.seed(42)
-    # Living room
-    list1 = load_words('wordlist_gpt_nonsense.txt')
-
-    # Draw first 15 words (5 from each list)
-    random_sampling = random.sample(list1, number_of_words*number_of_list)
-    random_list1 = random_sampling[0:number_of_words]
-    random_list2 = random_sampling[number_of_words:2*number_of_words]
-    random_list3 = random_sampling[2*number_of_words:3*number_of_words]
-    random_list4 = random_sampling[3*number_of_words:4*number_of_words]
-    random_list5 = random_sampling[4*number_of_words:5*number_of_words]
-    random_list6 = random_sampling[5*number_of_words:6*number_of_words]
-                                   
-
-    # Remove the seed
-    #random.seed()
-    
-    # Shuffle the internal order of both lists
-    random.shuffle(random_list1)
-    random.shuffle(random_list2)
-    random.shuffle(random_list3)
-    random.shuffle(random_list4)
-    random.shuffle(random_list5)
-    random.shuffle(random_list6)
-    return random_list1, random_list2, random_list3, random_list4, random_list5, random_list6
-
-def load_words(filename, both_words=False):
-    """
-    Load words from a text file.
-    
-    Each line in the file can contain either one word or two words separated by a space.
-    If both_words=True → load the entire line (both words).
-    If both_words=False → only load the first word on each line.
-
-    All words are converted to lowercase, and blank lines are ignored.
-    """
-    words = []
-    with open(filename, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip().lower()
-            if not line:
-                continue
-            if both_words:
-                words.append(line)
-            else:
-                words.append(line.split()[0])  # take only the first word
-    return words
-
-def get_instructions(participant_num):
-    """Order conditions based on participant number (counterbalancing)."""
-    if participant_num % 2 == 0:
-        return {"mirrored": "Write mirrored the word",
-                "normal": "Write normally the word"}
-    else:
-        return {"normal": "Write normally the word",
-                "mirrored": "Write mirrored the word"}
+    return allocate_participant("participants_results")
+
+# === STIMULUS CACHE ===
+
+class StimulusCache:
+    """
+    Pre-built TextStims for every word, instruction and fixation cross of a session.
+
+    Everything is built (and drawn once, so the glyph textures are uploaded) before
+    the first round, so the trial loops only call draw(). Word stimuli are released
+    with release() once their round is done; the instruction, hint and fixation
+    stimuli are shared by practice and all rounds.
+    """
+
+    def __init__(self, win):
+        self.win = win
+        self.words = {}
+        self.instructions = {}
+        self.hint = None
+        self.fixation = None
+        self.build_time = 0.0
+        self.python_bytes = 0
+        self.texture_bytes = 0
+
+    def build(self, instructions, word_lists):
+        """Build the stimuli for all instructions and all words in word_lists."""
+        start = core.getTime()
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+
+        self.hint = visual.TextStim(
+            self.win,
+            text="If you are done writing the word, press SPACE to skip to the next word.",
+            color="white",
+            height=25,
+            pos=(0, -300)  # near the bottom of the screen
+        )
+        self.fixation = visual.TextStim(self.win, text="+", color="white", height=60)
+        for condition_key, text in instructions.items():
+            self.instructions[condition_key] = visual.TextStim(
+                self.win, text=text, color="white", height=40, pos=(0, 80))
+        for words in word_lists:
+            for word in words:
+                if word not in self.words:
+                    self.words[word] = visual.TextStim(
+                        self.win, text=word.lower(), color="white", height=100, bold=True, pos=(0, -40))
+
+        # Draw everything once so the textures are uploaded now, then wipe the back buffer
+        for stim in self._all_stimuli():
+            stim.draw()
+        self.win.clearBuffer()
+
+        after, _ = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+        self.python_bytes = after - before
+        self.texture_bytes = sum(_texture_bytes(stim) for stim in self._all_stimuli())
+        self.build_time = core.getTime() - start
+        return self
+
+    def release(self, words):
+        """Drop the word stimuli of a finished round."""
+        for word in words:
+            self.words.pop(word, None)
+
+    def report(self):
+        """One-line summary of build time and memory."""
+        return (f"Stimulus cache: {len(self.words)} words, {len(self.instructions)} instructions "
+                f"built in {self.build_time * 1000:.1f} ms "
+                f"(python {self.python_bytes / 1024:.1f} KiB, textures ~{self.texture_bytes / 1024:.1f} KiB)")
+
+    def _all_stimuli(self):
+        stimuli = [self.hint, self.fixation]
+        stimuli.extend(self.instructions.values())
+        stimuli.extend(self.words.values())
+        return stimuli
+
+
+def _texture_bytes(stim):
+    """Estimate the RGBA texture size of a text stimulus from its bounding box."""
+    try:
+        width, height = stim.boundingBox
+    except (AttributeError, TypeError, ValueError):
+        return 0
+    return int(width) * int(height) * 4
+
+
+# === AUDIO TIMING ===
+
+AUDIO_CALIBRATION_BEEPS = 10
+
+
+def frames_for(win, secs):
+    """Number of whole refreshes closest to secs (at least one)."""
+    return max(1, int(round(secs / win.monitorFramePeriod)))
+
+
+def play_on_next_flip(win, beep):
+    """Schedule beep to start when the next flip lands; returns immediately."""
+    beep.play(when=win.getFutureFlipTime(clock="ptb"))
+
+
+def calibrate_audio(win, beep, n_beeps=AUDIO_CALIBRATION_BEEPS):
+    """
+    Measure the audio-to-visual offset of this session.
+
+    The beep is scheduled on a flip n_beeps times (muted) and the start time
+    reported by the sound device is compared with the flip timestamp, both on
+    the audio clock. Returns a dict with every offset and their mean and SD in
+    ms; a positive offset means the sound starts after the frame appears.
+    """
+    flip_to_audio_clock = core.monotonicClock.getLastResetTime()
+    volume = beep.volume
+    beep.setVolume(0)
+    offsets = []
+    try:
+        for _ in range(n_beeps):
+            win.flip()  # start each beep in step with the refresh cycle
+            play_on_next_flip(win, beep)
+            flip = win.flip() + flip_to_audio_clock
+            show_frames(win, [], frames_for(win, beep.secs))
+            start = (beep.statusDetailed or {}).get("StartTime")
+            beep.stop()
+            if start:
+                offsets.append(round((start - flip) * 1000, 3))
+    finally:
+        beep.setVolume(volume)
+
+    if not offsets:
+        return {"offsets_ms": [], "mean_ms": None, "sd_ms": None}
+    mean = sum(offsets) / len(offsets)
+    sd = (sum((offset - mean) ** 2 for offset in offsets) / max(1, len(offsets) - 1)) ** 0.5
+    return {"offsets_ms": offsets, "mean_ms": round(mean, 3), "sd_ms": round(sd, 3)}
+
+
+# === SCREENS ===
+
+def sleep(secs):
+    """Wait without spinning the CPU (core.wait busy-waits its last 0.2 s by default)."""
+    core.wait(secs, hogCPUperiod=0)
+
+
+class Screen:
+    """
+    Retained-mode screen: a fixed list of elements that is only drawn and flipped
+    when something on it changed. Between renders the last frame simply stays up,
+    so waiting on a screen costs no drawing and no flips.
+    """
+
+    def __init__(self, win, *elements):
+        self.win = win
+        self.elements = list(elements)
+        self.dirty = True
+
+    def set_text(self, element, text):
+        """Change one element's text; only a real change marks the screen dirty."""
+        if element.text != text:
+            element.text = text
+            self.dirty = True
+
+    def show(self):
+        """Put the screen up (draw + flip), e.g. after another screen was shown."""
+        for element in self.elements:
+            element.draw()
+        self.dirty = False
+        return self.win.flip()
+
+    def update(self):
+        """Re-render only if an element changed since the screen was last shown."""
+        if self.dirty:
+            return self.show()
+        return None
+
+    def wait_for_keys(self, key_list=("space",)):
+        """
+        Show the screen and wait until one of key_list is pressed, checking the
+        keyboard once per refresh period and sleeping in between (event.waitKeys
+        would spin a core the whole time). Returns the pressed keys.
+        """
+        self.show()
+        event.clearEvents(eventType='keyboard')
+        while True:
+            keys = event.getKeys(keyList=list(key_list))
+            if keys:
+                return keys
+            sleep(self.win.monitorFramePeriod)
+
+
+class Screens:
+    """
+    Every static and text-only screen of a session, built once up front so no
+    phase creates stimuli while it runs. Elements whose text changes (round
+    number, score, countdown) are separate stimuli, so only they are re-rendered.
+    """
+
+    def __init__(self, win):
+        def text(message="", **kwargs):
+            return visual.TextStim(win, text=message, color="white", **kwargs)
+
+        self.practice_start = Screen(win, text("Press SPACE to start practice before experiment.", height=40))
+        self.round_text = text(height=40)
+        self.round_start = Screen(win, self.round_text)
+        self.end = Screen(win, text("The experiment is over.\n\nThank you for participating!", height=40))
+
+        # Filler task
+        self.filler_instructions = Screen(win, text(
+            "TASK:\n\nPress SPACE only when you see a CIRCLE!\n"
+            "Ignore squares and triangles.\n\n(Press SPACE to start)", height=40, wrapWidth=1200))
+        self.shapes = [
+            visual.Circle(win, radius=60, fillColor="white", lineColor="white", pos=(0, 0)),
+            visual.Rect(win, width=120, height=120, fillColor="white", lineColor="white", pos=(0, 0)),
+            visual.ShapeStim(win, vertices=[(-60, -60), (60, -60), (0, 60)],
+                             fillColor="white", lineColor="white", pos=(0, 0)),
+        ]
+        # Static “Score:” label (stays fixed), only the number is re-rendered
+        self.score_label = text("Score:", height=30, pos=(-100, 330))
+        self.score_value = text("0", height=30, pos=(50, 330))
+        self.filler_end_text = text(height=40)
+        self.filler_end = Screen(win, self.filler_end_text)
+
+        # Recall test
+        self.recall_prompt = Screen(win, text(
+            "Have pen and paper ready to write down as many words as you can remember.\n\n"
+            "When ready press SPACE to begin the RECALL TEST.", height=40, wrapWidth=1200))
+        self.countdown_value = text(height=30, pos=(10, 320), anchorHoriz="left")  # top center
+        countdown_label = text("Time left:", height=30, pos=(-10, 320), anchorHoriz="right")
+        self.recall = Screen(
+            win,
+            text("Write down as many words as you can remember!", height=50, pos=(0, 0)),
+            countdown_label,
+            self.countdown_value)
+
+        # Typed recall test: the word being typed and the words entered so far
+        self.typed_recall_prompt = Screen(win, text(
+            "Type as many words as you can remember, pressing ENTER after each word.\n\n"
+            "When ready press SPACE to begin the RECALL TEST.", height=40, wrapWidth=1200))
+        self.typed_word = text(height=50, pos=(0, 0))
+        self.entered_words = text(height=30, pos=(0, -200), wrapWidth=1200)
+        self.typed_recall = Screen(
+            win,
+            text("Type a word you remember and press ENTER", height=30, pos=(0, 200)),
+            countdown_label,
+            self.countdown_value,
+            self.typed_word,
+            self.entered_words)
+
 
 # === MAIN TASK FUNCTIONS ===
 
-def begin_practice(win):
-    start_text = visual.TextStim(win, text="Press SPACE to start practice before experiment.",
-                                 color="white", height=40)
-    start_text.draw()
-    win.flip()
-    event.waitKeys(keyList=["space"])
+def begin_practice(win, screens=None):
+    screens = screens or Screens(win)
+    screens.practice_start.wait_for_keys(["space"])
 
 
-def run_test(win, beep, condition_key, words, timings, instructions):
+def run_test(win, beep, kb, condition_key, words, timings, stimuli):
     """Run a short practice phase (no logging)."""
     time_per_word, time_per_break, time_for_filler_task, time_for_recall = timings
-    condition_text = instructions[condition_key]
-
-    # Bottom hint text
-    hint_text = visual.TextStim(
-        win,
-        text="If you are done writing the word, press SPACE to skip to the next word.",
-        color="white",
-        height=25,
-        pos=(0, -300)
-    )
+    instr_text = stimuli.instructions[condition_key]
 
     for word in words:
         event.clearEvents(eventType='keyboard')
         win.flip()
 
-        # Display instruction, word, and hint
-        instr_text = visual.TextStim(win, text=condition_text, color="white", height=40, pos=(0, 80))
-        word_text = visual.TextStim(win, text=word.lower(), color="white", height=100, bold=True, pos=(0, -40))
+        # Display instruction, word, and hint until SPACE or timeout
+        onset, rt, key = wait_for_response(
+            win, kb, [instr_text, stimuli.words[word], stimuli.hint], time_per_word)
 
-        instr_text.draw()
-        word_text.draw()
-        hint_text.draw()
-        win.flip()
-
-        # Timer for this word
-        trial_timer = core.Clock()
-        skipped = False
-
-        # Wait for SPACE or timeout
-        while trial_timer.getTime() < time_per_word:
-            keys = event.getKeys(keyList=["space", "escape"])
-            if "escape" in keys:
-                win.close()
-                core.quit()
-            if "space" in keys:
-                skipped = True
-                break
-            core.wait(0.05)
-
-        # Beep plays only if the participant did NOT skip
-        if not skipped:
-            beep.play()
-            core.wait(0.4)
+        # Beep plays only if the participant did NOT skip, starting with the next frame
+        if key is None:
+            play_on_next_flip(win, beep)
+            sleep(BEEP_HOLD_TIME)
 
         # Clear accidental keypresses before next word
         event.clearEvents(eventType='keyboard')
+        kb.clearEvents()
 
         # Show fixation cross
-        fixation = visual.TextStim(win, text="+", color="white", height=60)
-        fixation.draw()
+        stimuli.fixation.draw()
         win.flip()
-        core.wait(time_per_break)
+        sleep(time_per_break)
 
     # Clear after practice
     win.flip()
 
-def begin_experiment(win, round):
+def begin_experiment(win, round, screens=None):
+    screens = screens or Screens(win)
     event.clearEvents(eventType='keyboard')
-    start_text = visual.TextStim(win, text=f"Press SPACE to start experiment round {round}.",
-                                 color="white", height=40)
-    start_text.draw()
-    win.flip()
-    event.waitKeys(keyList=["space"])
+    screens.round_start.set_text(screens.round_text, f"Press SPACE to start experiment round {round}.")
+    screens.round_start.wait_for_keys(["space"])
 
 
-def run_experiment(win, beep, condition_key, words, timings, instructions):
+def run_experiment(win, beep, kb, condition_key, words, timings, stimuli, on_trial=None):
     """
     Run one full experimental round and return trial logs.
-    Logs: word, condition, skipped (bool), and time_spent (seconds).
+    Logs: word, condition, skipped (bool), time_spent (seconds) and onset.
+    on_trial, if given, is called with each trial's log as soon as the trial ends.
+    onset is the flip timestamp at which the word appeared; time_spent is measured
+    from it with the keyboard's hardware timestamp (or the last frame on timeout).
     Participant can press SPACE to skip early (no beep).
     If they wait for the full time_per_word, a beep plays automatically.
     """
     event.clearEvents(eventType='keyboard')
     time_per_word, time_per_break, time_for_filler_task, time_for_recall_test = timings
     results = []
-    condition_text = instructions[condition_key]
-
-    # Persistent bottom hint text
-    hint_text = visual.TextStim(
-        win,
-        text="If you are done writing the word, press SPACE to skip to the next word.",
-        color="white",
-        height=25,
-        pos=(0, -300)  # near the bottom of the screen
-    )
+    instr_text = stimuli.instructions[condition_key]
 
     for word in words:
         event.clearEvents(eventType='keyboard')
         win.flip()
 
-        # Display instruction + word + hint
-        instr_text = visual.TextStim(win, text=condition_text, color="white", height=40, pos=(0, 80))
-        word_text = visual.TextStim(win, text=word.lower(), color="white", height=100, bold=True, pos=(0, -40))
+        # Display instruction + word + hint (all pre-built in the stimulus cache)
+        onset, time_spent, key = wait_for_response(
+            win, kb, [instr_text, stimuli.words[word], stimuli.hint], time_per_word)
+        skipped = key is not None
 
-        instr_text.draw()
-        word_text.draw()
-        hint_text.draw()
-        win.flip()
-
-        # Timer for current word
-        trial_timer = core.Clock()
-        skipped = False
-
-        # Wait for SPACE or timeout
-        while trial_timer.getTime() < time_per_word:
-            keys = event.getKeys(keyList=["space", "escape"])
-            if "escape" in keys:
-                win.close()
-                core.quit()
-            if "space" in keys:
-                skipped = True
-                break
-            core.wait(0.05)
-
-        # Record the time spent
-        time_spent = trial_timer.getTime()
-
-        # Beep plays ONLY if participant waited full duration
+        # Beep plays ONLY if participant waited full duration, starting with the next frame
         if not skipped:
-            beep.play()
-            core.wait(0.4)
+            play_on_next_flip(win, beep)
+            sleep(BEEP_HOLD_TIME)
 
         # Clear extra keypresses
         event.clearEvents(eventType='keyboard')
+        kb.clearEvents()
 
         # Fixation cross before next word
-        fixation = visual.TextStim(win, text="+", color="white", height=60)
-        fixation.draw()
+        stimuli.fixation.draw()
         win.flip()
 
         # Log trial
-        results.append({
+        trial = {
             "word": word,
             "condition": condition_key,
             "skipped": skipped,
-            "time_spent": round(time_spent, 3)
-        })
+            "time_spent": round(time_spent, 3),
+            "onset": round(onset, 3)
+        }
+        results.append(trial)
+        if on_trial is not None:
+            on_trial(trial)
 
-        core.wait(time_per_break)
+        sleep(time_per_break)
 
     # Clear after all trials
     win.flip()
@@ -269,260 +528,453 @@ def run_experiment(win, beep, condition_key, words, timings, instructions):
     return results
 
 
-def run_filler_task(win, time_for_filler_task):
+def wait_for_response(win, kb, stims, max_time, key_list=("space",)):
+    """
+    Show stims from the next flip until a key in key_list is pressed or max_time runs out.
+
+    The stimuli are drawn and flipped once; the frame stays up while the keyboard
+    is checked once per refresh period, sleeping in between. Returns (onset, time,
+    key): onset is the flip timestamp, time is the key's reaction time relative to
+    that flip (or the elapsed time on timeout) and key is the key name, or None on
+    timeout. ESCAPE quits.
+    """
+    keys_wanted = list(key_list) + ["escape"]
+
+    # Reset the keyboard clock and drop stale presses exactly at stimulus onset
+    for stim in stims:
+        stim.draw()
+    win.callOnFlip(kb.clock.reset)
+    win.callOnFlip(kb.clearEvents)
+    onset = win.flip()
+    poll_period = win.monitorFramePeriod
+
+    while True:
+        for key in kb.getKeys(keyList=keys_wanted, waitRelease=False):
+            if key.name == "escape":
+                win.close()
+                core.quit()
+            if key.rt < max_time:
+                return onset, key.rt, key.name
+        elapsed = kb.clock.getTime()
+        if elapsed >= max_time:
+            return onset, elapsed, None
+        sleep(min(poll_period, max_time - elapsed))
+
+
+# Filler task shapes, response window and feedback time (seconds)
+FILLER_SHAPES = ("circle", "square", "triangle")
+FILLER_RESPONSE_TIME = 0.4
+FILLER_FEEDBACK_TIME = 0.05
+
+
+def make_filler_schedule(time_for_filler_task, frame_period, seed=None):
+    """
+    Pre-generate the whole filler sequence as arrays before the task starts.
+
+    Returns a dict of equally long arrays: shape (index into FILLER_SHAPES),
+    x/y position (kept clear of the score at the top) and isi_frames (the
+    10-30 ms blank before each shape, in whole frames). Enough shapes are drawn
+    to fill time_for_filler_task even if no response ends a window early.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    n_shapes = int(np.ceil(time_for_filler_task / (0.01 + FILLER_FEEDBACK_TIME))) + 1
+    isi = rng.uniform(0.01, 0.03, n_shapes)
+    return {
+        "shape": rng.integers(0, len(FILLER_SHAPES), n_shapes),
+        "x": rng.integers(-600, 601, n_shapes),
+        "y": rng.integers(-250, 151, n_shapes),  # avoids top area
+        "isi_frames": np.maximum(1, np.rint(isi / frame_period)).astype(int),
+    }
+
+
+def show_frames(win, stims, n_frames):
+    """Show stims for n_frames refreshes, sleeping in the flips instead of spinning."""
+    for _ in range(n_frames):
+        for stim in stims:
+            stim.draw()
+        win.flip()
+
+
+def run_filler_task(win, kb, time_for_filler_task, log_path=None, seed=None, screens=None):
     """
     Run the filler task where the participant presses SPACE only when a circle appears.
     A live score is shown at the top (only number updates). +1 for correct, -1 for incorrect.
+    The shape sequence is generated up front; the blanks and feedback are locked to
+    frame flips. Each shape's onset, response and reaction time are returned and,
+    if log_path is given, saved there as a csv.
     """
-    # --- Instructions ---
-    filler_instr = visual.TextStim(
-        win,
-        text=("TASK:\n\nPress SPACE only when you see a CIRCLE!\n"
-              "Ignore squares and triangles.\n\n(Press SPACE to start)"),
-        color="white", height=40, wrapWidth=1200
-    )
+    # --- Shapes and schedule (built before the timed section) ---
+    screens = screens or Screens(win)
+    shapes = screens.shapes
+    score_label, score_value = screens.score_label, screens.score_value
 
-    filler_instr.draw()
-    win.flip()
-    event.waitKeys(keyList=["space"])
+    frame_period = win.monitorFramePeriod
+    schedule = make_filler_schedule(time_for_filler_task, frame_period, seed)
+    feedback_frames = max(1, int(round(FILLER_FEEDBACK_TIME / frame_period)))
 
-    # --- Shapes ---
-    circle = visual.Circle(win, radius=60, fillColor="white", lineColor="white", pos=(0, 0))
-    square = visual.Rect(win, width=120, height=120, fillColor="white", lineColor="white", pos=(0, 0))
-    triangle = visual.ShapeStim(win, vertices=[(-60, -60), (60, -60), (0, 60)],
-                                fillColor="white", lineColor="white", pos=(0, 0))
-    shapes = [("circle", circle), ("square", square), ("triangle", triangle)]
-
-    # --- Initialize timer and score ---
-    timer = core.Clock()
     score = 0
+    score_value.text = str(score)
 
-    # Static “Score:” label (stays fixed)
-    score_label = visual.TextStim(win, text="Score:", color="white", height=30, pos=(-100, 330))
-    score_value = visual.TextStim(win, text=str(score), color="white", height=30, pos=(50, 330))
+    # --- Instructions ---
+    screens.filler_instructions.wait_for_keys(["space"])
+
+    # --- Initialize timer ---
+    timer = core.Clock()
+    log = []
 
     # --- Task Loop ---
-    while timer.getTime() < time_for_filler_task:
-        # brief pause before next shape
-        win.flip()
-        core.wait(random.uniform(0.01, 0.03))
+    for i in range(len(schedule["shape"])):
+        if timer.getTime() >= time_for_filler_task:
+            break
 
-        # select random shape and randomize its position (but keep clear of top area)
-        shape_name, shape = random.choice(shapes)
-        shape.pos = (random.randint(-600, 600), random.randint(-250, 150))  # avoids top area
+        # brief blank pause before next shape
+        show_frames(win, [], schedule["isi_frames"][i])
 
-        # draw shape + score at the same time
-        score_label.draw()
-        score_value.draw()
-        shape.draw()
-        win.flip()
+        shape_name = FILLER_SHAPES[schedule["shape"][i]]
+        shape = shapes[schedule["shape"][i]]
+        shape.pos = (int(schedule["x"][i]), int(schedule["y"][i]))
 
-        # wait for response
-        response_timer = core.Clock()
-        response_made = False
-        while response_timer.getTime() < 0.4:
-            keys = event.getKeys(keyList=["space", "escape"])
-            if "escape" in keys:
-                win.close()
-                core.quit()
-            if "space" in keys:
-                response_made = True
-                break
+        # draw shape + score and wait for response
+        onset, rt, key = wait_for_response(
+            win, kb, [score_label, score_value, shape], FILLER_RESPONSE_TIME)
+        response_made = key is not None
 
-        # evaluate response
+        # evaluate response and update the score display (just the number is re-rendered)
         if response_made:
-            if shape_name == "circle":
-                score += 1  # correct
-            else:
-                score -= 1  # incorrect
-
-        # update score display (just the number)
-        score_value.text = str(score)
+            score += 1 if shape_name == "circle" else -1
+            score_value.text = str(score)
+
+        log.append({
+            "shape": shape_name,
+            "x": int(schedule["x"][i]),
+            "y": int(schedule["y"][i]),
+            "onset": round(onset, 3),
+            "responded": response_made,
+            "rt": round(rt, 3) if response_made else None,
+            "correct": response_made == (shape_name == "circle"),
+            "score": score
+        })
 
         # redraw only score after each shape
-        score_label.draw()
-        score_value.draw()
-        win.flip()
-        core.wait(0.05)
+        show_frames(win, [score_label, score_value], feedback_frames)
+
+    if log_path is not None:
+        import pandas as pd
+
+        pd.DataFrame(log).to_csv(log_path, index=False)
 
     # --- End filler ---
-    end_text = visual.TextStim(
-        win, text=f"Task complete!\nFinal Score: {score}", color="white", height=40
-    )
-    end_text.draw()
-    win.flip()
-    core.wait(3)
+    screens.filler_end.set_text(screens.filler_end_text, f"Task complete!\nFinal Score: {score}")
+    screens.filler_end.show()
+    sleep(FILLER_END_TIME)
 
+    return log
 
-def recall_phase(win, beep, time_for_recall_test):
+
+RECALL_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+RECALL_KEYS = list(RECALL_LETTERS) + ["backspace", "return", "escape"]
+
+
+def recall_phase(win, beep, kb, time_for_recall_test, screens=None, typed=False):
     """
     Run the recall phase where participants recall as many words as possible.
-    Displays a live countdown timer.
+    Displays a live countdown timer; the screen is only re-rendered when the
+    countdown (or the typed text) changes. The background keyboard is checked
+    once per refresh period, sleeping in between; it buffers presses with their
+    hardware timestamps, so no key is lost while the screen is being flipped.
+    With typed, the words are typed in on screen, each confirmed with ENTER
+    (BACKSPACE corrects), and returned as a list of {"response", "first_key",
+    "entered"}: the time of the word's first keystroke and of its ENTER in
+    seconds since the recall started. A word still being typed when the time
+    runs out counts as entered then. Without typed (pen and paper) returns [].
+    ESCAPE quits.
     """
+    screens = screens or Screens(win)
 
     # --- Prompt to start recall ---
-    recall_text = visual.TextStim(
-        win,
-        text=(
-            "Have pen and paper ready to write down as many words as you can remember.\n\n"
-            "When ready press SPACE to begin the RECALL TEST."
-        ),
-        color="white",
-        height=40,
-        wrapWidth=1200
-    )
-    recall_text.draw()
-    win.flip()
-    event.waitKeys(keyList=["space"])
-    core.wait(0.2)
+    (screens.typed_recall_prompt if typed else screens.recall_prompt).wait_for_keys(["space"])
+    sleep(RECALL_START_DELAY)
     event.clearEvents(eventType='keyboard')
 
-    # --- Recall message and timer setup ---
-    recall_message = visual.TextStim(
-        win, text="Write down as many words as you can remember!", color="white", height=50, pos=(0, 0)
-    )
-    timer_text = visual.TextStim(
-        win, text="", color="white", height=30, pos=(0, 320)  # top center
-    )
+    # --- Start recall timer (the keyboard clock, so key times are relative to it) ---
+    screen = screens.typed_recall if typed else screens.recall
+    screen.set_text(screens.typed_word, "")
+    screen.set_text(screens.entered_words, "")
+    screen.dirty = True  # shown in full first, after that only changes
+    kb.clock.reset()
+    kb.clearEvents()
+    keys_wanted = RECALL_KEYS if typed else ["escape"]
+    poll_period = win.monitorFramePeriod
+    entries, current, first_key = [], "", None
+
+    while True:
+        remaining = time_for_recall_test - kb.clock.getTime()
+        if remaining <= 0:
+            break
+        # Whole seconds left, rounded up: the full time shows for a second, "00:00" never while time is left
+        minutes, seconds = divmod(math.ceil(remaining), 60)
+        screen.set_text(screens.countdown_value, f"{minutes:02d}:{seconds:02d}")
+        screen.update()
+
+        for key in kb.getKeys(keyList=keys_wanted, waitRelease=False):
+            if key.name == "escape":
+                win.close()
+                core.quit()
+            if key.rt >= time_for_recall_test:
+                continue
+            if key.name == "return":
+                if current:
+                    entries.append({"response": current, "first_key": round(first_key, 3),
+                                    "entered": round(key.rt, 3)})
+                    screen.set_text(screens.entered_words, "   ".join(entry["response"] for entry in entries))
+                current, first_key = "", None
+            elif key.name == "backspace":
+                current = current[:-1]
+                first_key = first_key if current else None
+            else:
+                first_key = key.rt if not current else first_key
+                current += key.name
+            screen.set_text(screens.typed_word, current)
+        sleep(min(poll_period, remaining))
 
-    # --- Start recall timer ---
-    timer = core.Clock()
+    if current:
+        entries.append({"response": current, "first_key": round(first_key, 3),
+                        "entered": round(float(time_for_recall_test), 3)})
 
-    while timer.getTime() < time_for_recall_test:
-        # Calculate remaining time
-        remaining = int(time_for_recall_test - timer.getTime())
-        minutes, seconds = divmod(remaining, 60)
-        timer_display = f"Time left: {minutes:02d}:{seconds:02d}"
+    # --- End recall with beep, on the flip that clears the screen ---
+    play_on_next_flip(win, beep)
+    win.flip()
+    sleep(RECALL_BEEP_HOLD_TIME)
+    return entries
 
-        # Update timer text
-        timer_text.text = timer_display
 
-        # Draw both elements
-        recall_message.draw()
-        timer_text.draw()
-        win.flip()
+# === RUN EXPERIMENT ===
 
-        # Check for ESCAPE to exit early
-        keys = event.getKeys(keyList=["escape"])
-        if "escape" in keys:
-            win.close()
-            core.quit()
+class Session:
+    """Devices, stimuli and outputs of a running session, shared by the phase runners."""
+
+    def __init__(self, win, beep, kb, stimuli, screens, timings, participant_folder, session_log,
+                 store=None, participant_num=None, frames=None, outbox=None, typed_recall=False):
+        self.win = win
+        self.screens = screens
+        self.beep = beep
+        self.kb = kb
+        self.stimuli = stimuli
+        self.timings = timings
+        self.participant_folder = participant_folder
+        self.session_log = session_log
+        self.store = store
+        self.participant_num = participant_num
+        self.frames = frames
+        self.outbox = outbox
+        self.typed_recall = typed_recall
+
+
+def run_practice_phase(session, phase):
+    begin_practice(session.win, session.screens)
+    for condition, trials in itertools.groupby(phase.trials, key=lambda trial: trial.condition):
+        run_test(session.win, session.beep, session.kb, condition, [trial.word for trial in trials],
+                 session.timings, session.stimuli)
+
+
+def run_trials_phase(session, phase):
+    """Trials of one round; every trial is streamed to the session log as soon as it finishes."""
+    round, log = phase.round, session.session_log
+    begin_experiment(session.win, round, session.screens)
+    log.write({"type": "phase_start", "round": round, "phase": "trials"})
+    all_results = run_experiment(
+        session.win, session.beep, session.kb, phase.condition, phase.words, session.timings, session.stimuli,
+        on_trial=lambda trial: log.write({"type": "trial", "round": round, **trial}))
+    import pandas as pd
 
-        core.wait(0.5)  # update roughly every half second
+    df = pd.DataFrame(all_results)
+    df.to_csv(os.path.join(session.participant_folder, f"round_{round}.csv"), index=False)
+    if session.store is not None:
+        session.store.add_trials(session.participant_num, round, all_results)
+    if session.outbox is not None:
+        session.outbox.push(session.participant_num, round, all_results)
+
+
+def run_filler_phase(session, phase):
+    run_filler_task(session.win, session.kb, session.timings[2],
+                    log_path=os.path.join(session.participant_folder, f"filler_round_{phase.round}.csv"),
+                    screens=session.screens)
+
+
+def run_recall_phase(session, phase):
+    """Recall of one round; typed words go to the session log, recall_round_N.csv and the store."""
+    round, log = phase.round, session.session_log
+    entries = recall_phase(session.win, session.beep, session.kb, session.timings[3], session.screens,
+                           typed=session.typed_recall)
+    if not session.typed_recall:
+        return
+    for position, entry in enumerate(entries, start=1):
+        log.write({"type": "recall", "round": round, "position": position, **entry})
+    import pandas as pd
+
+    df = pd.DataFrame(entries, columns=["response", "first_key", "entered"])
+    df.to_csv(os.path.join(session.participant_folder, f"recall_round_{round}.csv"), index=False)
+    responses = [entry["response"] for entry in entries]
+    if session.store is not None:
+        session.store.add_responses(session.participant_num, round, responses)
+    if session.outbox is not None:
+        session.outbox.push_responses(session.participant_num, round, responses)
+
+
+PHASE_RUNNERS = {
+    "practice": run_practice_phase,
+    "trials": run_trials_phase,
+    "filler": run_filler_phase,
+    "recall": run_recall_phase,
+}
+
+
+def run_timeline(session, timeline, state=None):
+    """
+    Execute a compiled timeline (see session_timeline) phase by phase.
+    Phases already completed according to state (when resuming) are skipped; the
+    end of every phase is written to the session log, and the word stimuli of a
+    phase are released once it is over.
+    """
+    for phase in timeline.phases:
+        if state is None or not state.is_done(phase.round, phase.name):
+            if session.frames is not None:
+                session.frames.start_phase(phase.label)
+            PHASE_RUNNERS[phase.name](session, phase)
+            session.session_log.write({"type": "phase_end", "round": phase.round, "phase": phase.name})
+            if phase.name != "filler":
+                session.session_log.sync()
+        session.stimuli.release(phase.words)
+
+
+def main(backend="psychopy", keys=None, resume=None, startup_timer=None, frame_timing=True, spec=None,
+         collector=None):
+    """
+    Run a whole session, compiled from spec (overrides of session_timeline.SESSION_SPEC)
+    into a timeline before it starts. With resume=<participant number> the session of that
+    participant continues at the first phase its session log has not completed.
+    A per-stage startup timing breakdown is printed before the practice starts.
+    With frame_timing, every flip is recorded and a per-phase report of late and
+    dropped frames is written next to the round CSVs. With collector="host:port",
+    every finished round is also sent to a results_collector (spooled while it is
+    unreachable). With typed recall (spec "typed_recall", the default) the recalled
+    words go straight into recall_round_N.csv and the store, so the participant is
+    ready for analysis without a transcribed results workbook.
+    """
+    timer = startup_timer or StartupTimer()
 
-    # --- End recall with beep ---
-    beep.play()
-    core.wait(1)
+    # Select PsychoPy or the headless fast-forward backend (modules load lazily)
+    if backend == "headless":
+        use_backend(backend, keys=keys)
+    else:
+        use_backend(backend)
 
-    # --- Clear the screen after recall ---
-    win.flip()
+    # Create the window, with the beep tone and fonts loading in parallel
+    win, beep = initialize_devices(timer)
 
+    # Background keyboard for hardware-timestamped responses
+    with timer.stage("keyboard"):
+        kb = initialize_keyboard()
 
-# === RUN EXPERIMENT ===
+    # Flip timestamps per phase (the refresh rate is measured here)
+    with timer.stage("frame timing"):
+        frames = FrameTimer(win, core.getTime, enabled=frame_timing)
 
-def main():
-    
-    # Create the window
-    win = initialize_screen()
-    
-    # Create the beep tone
-    beep = initialize_beep()
+    # Audio-to-visual offset of this session's devices, logged for correcting onsets
+    with timer.stage("audio calibration"):
+        audio_calibration = calibrate_audio(win, beep)
+    print(f"Audio onset offset: {audio_calibration['mean_ms']} ms "
+          f"(SD {audio_calibration['sd_ms']} ms, n={len(audio_calibration['offsets_ms'])})")
 
     # Create main folder
     create_main_folder()
-    
-    # Create folder and participant folder
-    participant_folder, participant_num = create_participant_folder()
-
-
-    # Instructions in an order depending on 
-    instructions = get_instructions(participant_num)
-
-    # Timings (seconds)
-    time_per_word = 28 # 28 
-    time_per_break = 1.5
-    time_for_filler_task = 3 #60
-    time_for_recall = 10 #60
-    timings = (time_per_word, time_per_break, time_for_filler_task, time_for_recall)
-    #timings = (min(time_per_word, 5), min(time_per_break,1), min(time_for_filler_task,10), min(time_for_recall,10))
-
-    # Shorter timings for practice
-    #timings_test = (min(time_per_word, 5), min(time_per_break, 1.0), min(time_for_filler_task, 10), min(time_for_recall, 10))
-    timings_test = (time_per_word, time_per_break, time_for_filler_task, time_for_recall)
-    
-    begin_practice(win)
-    # Practice (use a tiny clean list)
-    practice_words = ['sam']
-    for condition in instructions.keys():
-        run_test(win, beep, condition, practice_words, timings, instructions)
-        #run_filler_task(win, time_for_filler_task=30)
-        #recall_phase(win, beep, time_for_recall=10)
-
-    # Word sets for the two rounds
-    words_round1, words_round2, words_round3, words_round4, words_round5, words_round6 = get_word_sets()
-    
-    # Run the two real rounds (use list() for indexing)
-    all_results = []
-    conditions = list(instructions.keys())
-    round = 1
-    begin_experiment(win, round)
-    # 1st Round
-    all_results = run_experiment(win, beep, conditions[0], words_round1, timings, instructions)
-    df = pd.DataFrame(all_results)
-    df.to_csv(os.path.join(participant_folder, f"round_{round}.csv"), index=False)
-    run_filler_task(win, time_for_filler_task)
-    recall_phase(win, beep, time_for_recall)
-
-    round +=1
-    begin_experiment(win, round)
-    # 2nd Round
-    all_results = run_experiment(win, beep, conditions[1], words_round2, timings, instructions)
-    df = pd.DataFrame(all_results)
-    df.to_csv(os.path.join(participant_folder, f"round_{round}.csv"), index=False)
-    run_filler_task(win, time_for_filler_task)
-    recall_phase(win, beep, time_for_recall)
-
-    round +=1
-    begin_experiment(win, round)
-    # 3rd Round
-    all_results = run_experiment(win, beep, conditions[0], words_round3, timings, instructions)
-    df = pd.DataFrame(all_results)
-    df.to_csv(os.path.join(participant_folder, f"round_{round}.csv"), index=False)
-    run_filler_task(win, time_for_filler_task)
-    recall_phase(win, beep, time_for_recall)
-    round += 1
-    begin_experiment(win, round)
-    # 4th Round
-    all_results = run_experiment(win, beep, conditions[1], words_round4, timings, instructions)
-    df = pd.DataFrame(all_results)
-    df.to_csv(os.path.join(participant_folder, f"round_{round}.csv"), index=False)
-    run_filler_task(win, time_for_filler_task)
-    recall_phase(win, beep, time_for_recall)
-
-    round +=1
-    begin_experiment(win, round)
-    # 5th Round
-    all_results = run_experiment(win, beep, conditions[0], words_round5, timings, instructions)
-    df = pd.DataFrame(all_results)
-    df.to_csv(os.path.join(participant_folder, f"round_{round}.csv"), index=False)
-    run_filler_task(win, time_for_filler_task)
-    recall_phase(win, beep, time_for_recall)
-
-    round += 1
-    begin_experiment(win, round)
-    # 6th Round
-    all_results = run_experiment(win, beep, conditions[1], words_round6, timings, instructions)
-    df = pd.DataFrame(all_results)
-    df.to_csv(os.path.join(participant_folder, f"round_{round}.csv"), index=False)
-    run_filler_task(win, time_for_filler_task)
-    recall_phase(win, beep, time_for_recall)
+
+    if resume is None:
+        # Create folder and participant folder
+        participant_folder, participant_num = create_participant_folder()
+
+        # Counterbalanced condition order and word sets from the compiled schedule
+        # (numpy is only imported for new sessions; a resumed one reads them from its log)
+        from stimulus_bank import participant_schedule
+        instructions, word_sets, round_conditions = participant_schedule(participant_num)
+        state = None
+    else:
+        # Continue a crashed or aborted session from its log
+        participant_num = resume
+        participant_folder = f"participants_results/participant_{participant_num}"
+        state = read_session(os.path.join(participant_folder, SESSION_LOG))
+        if state.header is None:
+            raise RuntimeError(f"No session to resume in {participant_folder}")
+        instructions = state.header["instructions"]
+        word_sets = state.header["word_sets"]
+        conditions = list(instructions.keys())
+        round_conditions = state.header.get(
+            "round_conditions", [conditions[i % 2] for i in range(len(word_sets))])
+        # The resumed session keeps the spec it was started with
+        time_per_word, time_per_break, time_for_filler_task, time_for_recall = state.header["timings"]
+        spec = state.header.get("spec", {
+            "time_per_word": time_per_word, "time_per_break": time_per_break,
+            "time_for_filler_task": time_for_filler_task, "time_for_recall": time_for_recall,
+            "practice_words": state.header["practice_words"]})
+        # Sessions started before typed recall existed stay on pen and paper
+        spec = {"typed_recall": False, **spec}
+
+    # Every phase, trial and duration of the session, compiled before it starts
+    timeline = compile_timeline(instructions, word_sets, round_conditions, spec)
+    print(timeline.describe(state))
+
+    session_log = SessionLog(os.path.join(participant_folder, SESSION_LOG))
+    store = ResultsStore(STORE_PATH)
+    store.add_participant(participant_num, participant_num % 2)
+    outbox = None
+    if collector:
+        # asyncio is only imported when the session sends its results to a collector
+        from results_collector import Outbox, parse_address
+        outbox = Outbox(parse_address(collector))
+    try:
+        if state is None:
+            session_log.write({"type": "session", "participant": participant_num,
+                               "instructions": instructions, "word_sets": word_sets,
+                               "round_conditions": round_conditions, "spec": timeline.spec,
+                               "practice_words": timeline.spec["practice_words"], "timings": timeline.timings})
+        else:
+            # Onsets after this record are on the new session's clock
+            session_log.write({"type": "resume"})
+        session_log.write({"type": "audio_calibration", **audio_calibration})
+
+        # Pre-render every stimulus the remaining timeline references so the trial loops only draw,
+        # while pandas is imported in the background
+        results_modules = preload_results_modules(timer)
+        with timer.stage("stimulus cache"):
+            stimuli = StimulusCache(win).build(instructions, timeline.word_lists(state))
+        with timer.stage("screens"):
+            screens = Screens(win)
+        with timer.stage("wait for pandas"):
+            results_modules.join()
+        print(stimuli.report())
+        print(timer.report())
+
+        session = Session(win, beep, kb, stimuli, screens, timeline.timings, participant_folder, session_log,
+                          store, participant_num, frames, outbox, timeline.spec["typed_recall"])
+        run_timeline(session, timeline, state)
+        if session.typed_recall:
+            # Every round's typed recall is in the store: no transcription needed
+            store.mark_recall_complete(participant_num)
+            if outbox is not None:
+                outbox.push_recall_complete(participant_num)
+    finally:
+        # Escape (SystemExit) or a crash still leaves every finished trial on disk
+        session_log.close()
+        store.close()
+        if outbox is not None:
+            print(f"Rounds not yet delivered to the collector: {outbox.flush()}")
+        frames.write_report(participant_folder)
+        print(frames.report())
 
     # End screen
-    end_text = visual.TextStim(win, text="The experiment is over.\n\nThank you for participating!",
-                               color="white", height=40)
-    end_text.draw()
-    win.flip()
-    event.waitKeys(keyList=["escape"])
+    screens.end.wait_for_keys(["escape"])
     win.close()
     core.quit()
 
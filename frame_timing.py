@@ -0,0 +1,110 @@
+"""
+Frame-timing instrumentation.
+
+FrameTimer wraps a window's flip() and records the timestamp of every flip
+under the current phase (practice, round 1 trials, round 1 filler, ...). The
+report compares the frame intervals of each phase with the refresh period
+measured at startup and flags late frames (interval more than late_tolerance
+above one period) and dropped frames (refreshes missed in between). When the
+experiment itself spent more than max_gap between two flips (waiting for a key,
+a break) the interval is counted as a pause instead. When disabled, flip() is
+left untouched and switching phases only sets an attribute.
+"""
+import os
+import time
+
+TIMING_REPORT = "frame_timing.csv"
+
+
+def measure_refresh_period(win):
+    """Refresh period of the window in seconds, measured if the backend can."""
+    try:
+        rate = win.getActualFrameRate()
+    except AttributeError:
+        rate = None
+    return 1.0 / rate if rate else win.monitorFramePeriod
+
+
+class FrameTimer:
+    """Records every win.flip() timestamp per phase."""
+
+    def __init__(self, win, clock, enabled=True, late_tolerance=0.2, max_gap=0.1):
+        """clock is a function returning the current time (e.g. core.getTime)."""
+        self.enabled = enabled
+        self.late_tolerance = late_tolerance
+        self.max_gap = max_gap
+        self.phases = {}
+        self.phase = None
+        self._times = self._calls = self._returns = []
+        self.started = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.refresh_period = measure_refresh_period(win) if enabled else None
+        if enabled:
+            flip = win.flip
+
+            def timed_flip(*args, **kwargs):
+                self._calls.append(clock())
+                t = flip(*args, **kwargs)
+                self._returns.append(clock())
+                self._times.append(t)
+                return t
+
+            # Shadow the bound method on this window only
+            win.flip = timed_flip
+        self.start_phase("startup")
+
+    def start_phase(self, name):
+        """Record the following flips under name."""
+        self.phase = name
+        if self.enabled:
+            self._times, self._calls, self._returns = self.phases.setdefault(name, ([], [], []))
+
+    def summary(self):
+        """One dict of frame statistics per phase, in the order the phases started."""
+        import numpy as np
+
+        period = self.refresh_period
+        rows = []
+        for name, (times, calls, returns) in self.phases.items():
+            intervals = np.diff(np.asarray(times, dtype=float))
+            # Time the experiment spent between returning from one flip and calling the next
+            idle = np.asarray(calls[1:], dtype=float) - np.asarray(returns[:-1], dtype=float)
+            pauses = idle > self.max_gap
+            intervals = intervals[~pauses]
+            late = intervals > period * (1 + self.late_tolerance)
+            dropped = np.maximum(np.rint(intervals[late] / period) - 1, 0).sum()
+            rows.append({
+                "session": self.started,
+                "phase": name,
+                "flips": len(times),
+                "refresh_ms": round(period * 1000, 3),
+                "mean_interval_ms": round(float(intervals.mean()) * 1000, 3) if len(intervals) else None,
+                "sd_interval_ms": round(float(intervals.std()) * 1000, 3) if len(intervals) else None,
+                "max_interval_ms": round(float(intervals.max()) * 1000, 3) if len(intervals) else None,
+                "late_frames": int(late.sum()),
+                "dropped_frames": int(dropped),
+                "pauses": int(pauses.sum()),
+            })
+        return rows
+
+    def write_report(self, folder):
+        """Append this session's summary to the timing report in folder; returns its path."""
+        if not self.enabled:
+            return None
+        path = os.path.join(folder, TIMING_REPORT)
+        import pandas as pd
+
+        pd.DataFrame(self.summary()).to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+        return path
+
+    def report(self):
+        """One-line summary of late and dropped frames over all phases."""
+        if not self.enabled:
+            return "Frame timing: disabled"
+        rows = self.summary()
+        flips = sum(row["flips"] for row in rows)
+        late = sum(row["late_frames"] for row in rows)
+        dropped = sum(row["dropped_frames"] for row in rows)
+        worst = [row["phase"] for row in rows if row["dropped_frames"]]
+        text = (f"Frame timing: {flips} flips at {self.refresh_period * 1000:.2f} ms, "
+                f"{late} late, {dropped} dropped")
+        return text + (f" (in {', '.join(worst)})" if worst else "")
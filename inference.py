@@ -0,0 +1,118 @@
+"""
+Paired bootstrap confidence intervals and permutation tests over participants_summary.
+
+Both work on the per-participant differences mirrored - normal. Resamples are
+drawn as NumPy arrays in chunks of at most chunk_cells values (so memory stays
+bounded for thousands of participants) and the chunks can be spread over a
+process pool. The permutation test flips the sign of each participant's
+difference (the paired null hypothesis); it enumerates all 2^n sign patterns
+when that is at most n_resamples and samples them otherwise.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# (name, mirrored column, normal column) of participants_summary.csv
+COMPARISONS = [
+    ("words", "avg_words_mirrored", "avg_words_normal"),
+    ("time(s)", "avg_mirrored_time(s)", "avg_normal_time(s)"),
+]
+
+
+def _chunks(total, per_chunk):
+    return [(start, min(per_chunk, total - start)) for start in range(0, total, per_chunk)]
+
+
+def _run(function, jobs, workers):
+    if workers == 1 or len(jobs) == 1:
+        return [function(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, *zip(*jobs)))
+
+
+def _bootstrap_chunk(differences, count, seed):
+    """Means of count bootstrap resamples of the participants."""
+    rng = np.random.default_rng(seed)
+    n = len(differences)
+    return differences[rng.integers(0, n, (count, n), dtype=np.int32)].mean(axis=1)
+
+
+def _sign_flip_chunk(differences, start, count, seed, exact, threshold):
+    """Number of sign patterns whose absolute mean reaches the observed one."""
+    n = len(differences)
+    if exact:
+        patterns = np.arange(start, start + count, dtype=np.int64)[:, None] >> np.arange(n)
+        flipped = (patterns & 1).astype(float)
+        weights = differences
+    else:
+        # One random bit per participant and resample, straight from the generator's bytes
+        rng = np.random.default_rng(seed)
+        bits = np.unpackbits(np.frombuffer(rng.bytes((count * n + 7) // 8), dtype=np.uint8), count=count * n)
+        flipped = bits.reshape(count, n).astype(np.float32)
+        weights = differences.astype(np.float32)
+    # Flipping the sign of a subset subtracts twice its sum: one matrix-vector product
+    means = (differences.sum() - 2 * (flipped @ weights)) / n
+    return int((np.abs(means) >= threshold).sum())
+
+
+def paired_bootstrap_ci(differences, n_resamples=100_000, confidence=0.95, seed=None, workers=1,
+                        chunk_cells=10_000_000):
+    """Percentile bootstrap confidence interval of the mean paired difference."""
+    differences = np.asarray(differences, dtype=float)
+    per_chunk = max(1, chunk_cells // len(differences))
+    chunks = _chunks(n_resamples, per_chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(differences, count, chunk_seed) for (start, count), chunk_seed in zip(chunks, seeds)]
+    means = np.concatenate(_run(_bootstrap_chunk, jobs, workers or os.cpu_count() or 1))
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(means, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def permutation_test(differences, n_resamples=100_000, seed=None, workers=1, chunk_cells=10_000_000):
+    """
+    Two-sided sign-flip permutation test of mean difference = 0.
+    Returns (p_value, exact).
+    """
+    differences = np.asarray(differences, dtype=float)
+    n = len(differences)
+    # Small tolerance so patterns equal to the observed one count despite rounding
+    threshold = abs(differences.mean()) * (1 - 1e-12)
+    exact = n < 63 and 2 ** n <= n_resamples
+    total = 2 ** n if exact else n_resamples
+    per_chunk = max(1, chunk_cells // n)
+    chunks = _chunks(total, per_chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(differences, start, count, chunk_seed, exact, threshold)
+            for (start, count), chunk_seed in zip(chunks, seeds)]
+    extreme = sum(_run(_sign_flip_chunk, jobs, workers or os.cpu_count() or 1))
+    if exact:
+        return extreme / total, True
+    # Monte Carlo p-value including the observed pattern itself
+    return (extreme + 1) / (total + 1), False
+
+
+def summarize_effects(participants_df, n_resamples=100_000, confidence=0.95, seed=None, workers=1):
+    """
+    Bootstrap CI and permutation p-value of mirrored - normal for every comparison
+    in COMPARISONS. Returns a list of dicts, one per comparison.
+    """
+    rows = []
+    for name, mirrored, normal in COMPARISONS:
+        data = participants_df[[mirrored, normal]].dropna()
+        differences = (data[mirrored] - data[normal]).to_numpy(dtype=float)
+        if len(differences) < 2:
+            continue
+        low, high = paired_bootstrap_ci(differences, n_resamples, confidence, seed, workers)
+        p_value, exact = permutation_test(differences, n_resamples, seed, workers)
+        rows.append({
+            "measure": name,
+            "n": len(differences),
+            "mean_difference": round(float(differences.mean()), 4),
+            "ci_low": round(low, 4),
+            "ci_high": round(high, 4),
+            "p_value": round(p_value, 6),
+            "test": "exact" if exact else "monte carlo",
+        })
+    return rows
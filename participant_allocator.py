@@ -0,0 +1,122 @@
+"""
+Atomic participant ID allocation for several stations sharing one results folder.
+
+The next free ID lives in a small counter file next to the participant folders.
+It is read, claimed and advanced while holding a lock file created with
+O_CREAT | O_EXCL, which is atomic on local disks and on SMB/NFS shares, so two
+stations starting at the same moment never get the same participant. Allocation
+is constant-time: the folder is only scanned once, to seed a missing counter.
+"""
+import os
+import re
+import socket
+import time
+
+COUNTER_FILE = ".next_participant"
+LOCK_FILE = ".participant.lock"
+FOLDER_PATTERN = re.compile(r"participant_(\d+)$")
+
+
+class FolderLock:
+    """Cross-process lock based on exclusive creation of a lock file."""
+
+    def __init__(self, path, timeout=30.0, stale_after=60.0, poll_interval=0.01):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._break_if_stale()
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not lock {self.path} within {self.timeout} s")
+                time.sleep(self.poll_interval)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{socket.gethostname()} {os.getpid()}\n")
+            return
+
+    def release(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _break_if_stale(self):
+        # A station that crashed while holding the lock must not block the lab forever
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return
+        if age > self.stale_after:
+            self.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def _scan_next_id(results_dir):
+    """One-off O(n) scan used only when the counter file does not exist yet."""
+    highest = 0
+    with os.scandir(results_dir) as entries:
+        for entry in entries:
+            match = FOLDER_PATTERN.match(entry.name)
+            if match and entry.is_dir():
+                highest = max(highest, int(match.group(1)))
+    return highest + 1
+
+
+def _read_counter(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_counter(path, value):
+    # Write-then-rename so a crash never leaves a half-written counter
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"{value}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def allocate_participant(results_dir="participants_results"):
+    """
+    Atomically claim the next participant ID and create its folder.
+    Returns (participant_folder, participant_num); the participant's condition
+    order and words follow from the number (stimulus_bank.participant_schedule).
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    counter_path = os.path.join(results_dir, COUNTER_FILE)
+
+    with FolderLock(os.path.join(results_dir, LOCK_FILE)):
+        participant_num = _read_counter(counter_path)
+        if participant_num is None:
+            participant_num = _scan_next_id(results_dir)
+
+        # The folder itself is created exclusively too, so folders made by hand
+        # (or by an older version of the experiment) are skipped, never reused
+        while True:
+            participant_folder = f"{results_dir}/participant_{participant_num}"
+            try:
+                os.makedirs(participant_folder)
+                break
+            except FileExistsError:
+                participant_num += 1
+
+        _write_counter(counter_path, participant_num + 1)
+
+    return participant_folder, participant_num
@@ -0,0 +1,184 @@
+"""
+Monte Carlo power analysis for the normal vs. mirrored design.
+
+Synthetic experiments use the design of experiment_utils.main(): 6 rounds of
+5 words with alternating conditions, so every participant has 3 rounds (15
+words) per condition. Per participant, recall follows a logistic model with a
+random participant baseline, and the mean time per word is drawn with a random
+participant baseline plus trial noise (capped at the 28 s a word is shown).
+Each simulated experiment is analysed with the paired t-test on the
+per-participant mirrored - normal differences, and power is the fraction of
+simulated experiments with p < alpha.
+
+All experiments of one chunk are drawn as one NumPy array; chunks are spread
+over a process pool.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Design of experiment_utils.main()
+NUMBER_OF_ROUNDS = 6
+NUMBER_OF_WORDS = 5
+TIME_PER_WORD = 28
+
+DEFAULT_MODEL = {
+    "baseline_recall": 0.5,    # recall probability in the normal condition
+    "recall_effect": 0.3,      # mirrored - normal, in log odds
+    "subject_sd": 0.8,         # between-participant SD of the baseline, in log odds
+    "time_normal": 8.0,        # mean seconds per word, normal condition
+    "time_effect": 4.0,        # mirrored - normal, seconds per word
+    "time_subject_sd": 3.0,    # between-participant SD of the time per word
+    "time_trial_sd": 4.0,      # trial-to-trial SD of the time per word
+}
+
+
+def _incomplete_beta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b) (continued fraction, modified Lentz)."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        # The continued fraction converges fast below the mean only
+        return 1.0 - _incomplete_beta(b, a, 1 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 1000):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return front * result
+
+
+def t_two_sided_p(t, df):
+    """Two-sided p-value of Student's t with df degrees of freedom."""
+    return _incomplete_beta(df / 2, 0.5, df / (df + t * t))
+
+
+def t_critical(alpha, df):
+    """Two-sided critical value of Student's t, exact for every df >= 1 (bisection on t_two_sided_p)."""
+    low, high = 0.0, 1.0
+    while t_two_sided_p(high, df) > alpha:
+        low, high = high, high * 2
+    while high - low > 1e-12 * high:
+        middle = (low + high) / 2
+        if t_two_sided_p(middle, df) > alpha:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def _paired_t(differences):
+    """t statistics of the paired t-test along the last axis."""
+    n = differences.shape[-1]
+    mean = differences.mean(axis=-1)
+    sd = differences.std(axis=-1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = mean / (sd / math.sqrt(n))
+    return np.nan_to_num(t, nan=0.0)
+
+
+def simulate_experiments(n_participants, n_experiments, rng, model=None):
+    """
+    Simulate n_experiments experiments of n_participants each.
+    Returns the t statistics (words, time) of every experiment, each an array of
+    shape (n_experiments,).
+    """
+    model = {**DEFAULT_MODEL, **(model or {})}
+    shape = (n_experiments, n_participants)
+    words_per_condition = NUMBER_OF_WORDS * NUMBER_OF_ROUNDS // 2
+
+    # Recall: words remembered over the 3 rounds of each condition
+    baseline = math.log(model["baseline_recall"] / (1 - model["baseline_recall"]))
+    logit = baseline + rng.normal(0.0, model["subject_sd"], shape)
+    p_normal = 1 / (1 + np.exp(-logit))
+    p_mirrored = 1 / (1 + np.exp(-(logit + model["recall_effect"])))
+    words_normal = rng.binomial(words_per_condition, p_normal)
+    words_mirrored = rng.binomial(words_per_condition, p_mirrored)
+    # Per-participant difference of the mean words per round, as in participants_summary
+    rounds_per_condition = NUMBER_OF_ROUNDS // 2
+    t_words = _paired_t((words_mirrored - words_normal) / rounds_per_condition)
+
+    # Time: participant baseline plus the mean of 15 noisy trials per condition
+    subject_time = model["time_normal"] + rng.normal(0.0, model["time_subject_sd"], shape)
+    trial_noise_sd = model["time_trial_sd"] / math.sqrt(words_per_condition)
+    time_normal = np.clip(subject_time + rng.normal(0.0, trial_noise_sd, shape), 0, TIME_PER_WORD)
+    time_mirrored = np.clip(subject_time + model["time_effect"] + rng.normal(0.0, trial_noise_sd, shape),
+                            0, TIME_PER_WORD)
+    t_time = _paired_t(time_mirrored - time_normal)
+    return t_words, t_time
+
+
+def _simulate_chunk(n_participants, n_experiments, seed, model, alpha):
+    """Count significant experiments in one chunk (runs in a worker process)."""
+    rng = np.random.default_rng(seed)
+    t_words, t_time = simulate_experiments(n_participants, n_experiments, rng, model)
+    critical = t_critical(alpha, n_participants - 1)
+    return (n_participants, int((np.abs(t_words) > critical).sum()),
+            int((np.abs(t_time) > critical).sum()), n_experiments)
+
+
+def estimate_power(sample_sizes, n_experiments=10000, model=None, alpha=0.05, seed=None, workers=None,
+                   chunk_cells=5_000_000):
+    """
+    Estimate power for every sample size in sample_sizes.
+    n_experiments experiments are simulated per sample size, in chunks of at most
+    chunk_cells participants so memory stays bounded. Returns a list of dicts
+    with n_participants, power_words and power_time.
+    """
+    chunks = []
+    for n_participants in sample_sizes:
+        if n_participants < 2:
+            raise ValueError("The paired t-test needs at least 2 participants")
+        per_chunk = max(1, chunk_cells // n_participants)
+        for start in range(0, n_experiments, per_chunk):
+            chunks.append((n_participants, min(per_chunk, n_experiments - start)))
+    # Independent random streams per chunk, reproducible for a given seed
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(n_participants, count, chunk_seed, model, alpha)
+            for (n_participants, count), chunk_seed in zip(chunks, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [_simulate_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*jobs)))
+
+    totals = {n: [0, 0, 0] for n in sample_sizes}
+    for n_participants, significant_words, significant_time, count in results:
+        totals[n_participants][0] += significant_words
+        totals[n_participants][1] += significant_time
+        totals[n_participants][2] += count
+    return [{"n_participants": n,
+             "power_words": round(words / count, 4),
+             "power_time": round(time / count, 4)}
+            for n, (words, time, count) in totals.items()]
+
+
+if __name__ == '__main__':
+    import time
+
+    sample_sizes = [6, 10, 20, 30, 40, 60, 80, 100, 150, 200]
+    n_experiments = 100_000  # per sample size -> 10^6 simulated experiments
+    start = time.perf_counter()
+    power = estimate_power(sample_sizes, n_experiments, seed=1)
+    elapsed = time.perf_counter() - start
+    print(f"{'participants':>12} {'power words':>12} {'power time':>12}")
+    for row in power:
+        print(f"{row['n_participants']:>12} {row['power_words']:>12.3f} {row['power_time']:>12.3f}")
+    print(f"{len(sample_sizes) * n_experiments} simulated experiments in {elapsed:.1f} s")
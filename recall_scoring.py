@@ -0,0 +1,171 @@
+"""
+Automated scoring of recall responses against the presented words.
+
+Each response is matched through BK-trees (edit-distance indexes) over all
+words presented to any participant and classified as:
+
+- correct:    exactly a word of the same round
+- near-miss:  within max_distance edits of a word of the same round (a misspelling)
+- intrusion:  a word (or misspelling of one) from another round, or no word at all
+- duplicate:  a word of the same round that was already credited earlier
+
+An exact match always wins over a misspelling: a response that is exactly a
+word of another round is an intrusion, even if it is also one edit away from a
+word of its own round. A word is credited once per round; if it was first
+credited to a near-miss, a later exact response takes the credit over and the
+near-miss becomes the duplicate.
+
+Only correct responses count as recalled words in the analysis.
+"""
+import pandas as pd
+
+CATEGORIES = ["correct", "near-miss", "intrusion", "duplicate"]
+
+
+def levenshtein(a, b, limit=None):
+    """Edit distance between a and b; stops early once it exceeds limit."""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree for nearest-word lookups under edit distance."""
+
+    def __init__(self, words=()):
+        self.root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node_word, children = self.root
+        while True:
+            distance = levenshtein(word, node_word)
+            if distance == 0:
+                return
+            if distance not in children:
+                children[distance] = (word, {})
+                return
+            node_word, children = children[distance]
+
+    def search(self, word, max_distance):
+        """All (distance, word) pairs within max_distance of word."""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            distance = levenshtein(word, node_word)
+            if distance <= max_distance:
+                found.append((distance, node_word))
+            # Triangle inequality: only subtrees at distance +- max_distance can match
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+
+def normalize(response):
+    return " ".join(str(response).strip().lower().split())
+
+
+def default_max_distance(word):
+    """Allowed misspelling: 1 edit for words up to 7 letters, 2 for longer ones."""
+    return 1 if len(word) <= 7 else 2
+
+
+def score_responses(trials, responses, max_distance=None):
+    """
+    Classify every recall response.
+    trials: long table with participant, round and word (the presented words).
+    responses: long table with participant, round, position and response.
+    Returns responses with matched_word, matched_round, distance and category columns.
+    """
+    presented = trials[["participant", "round", "word"]].astype({"word": str})
+    presented = presented.assign(word=presented["word"].map(normalize))
+    # The allowed misspelling is a property of the presented word: one tree per limit,
+    # each searched with its own limit
+    words_by_limit = {}
+    for word in presented["word"].unique():
+        limit = max_distance if max_distance is not None else default_max_distance(word)
+        words_by_limit.setdefault(limit, []).append(word)
+    trees = [(limit, BKTree(words)) for limit, words in words_by_limit.items()]
+    rounds_of = {}
+    for participant, word, round_number in zip(presented["participant"], presented["word"], presented["round"]):
+        rounds_of.setdefault((participant, word), []).append(round_number)
+
+    matched_words, matched_rounds, distances, categories = [], [], [], []
+    credited = {}  # (participant, round, word) -> index of the response holding the credit
+    # The same responses come up again and again: look each one up in the tree only once
+    candidates = {}
+    for participant, round_number, response in zip(responses["participant"], responses["round"],
+                                                    responses["response"]):
+        response = normalize(response)
+        if response not in candidates:
+            candidates[response] = [match for limit, tree in trees for match in tree.search(response, limit)]
+        best = None
+        # Prefer exact matches, then matches from the same round, then the closest word
+        for distance, word in candidates[response]:
+            rounds = rounds_of.get((participant, word))
+            if not rounds:
+                continue
+            matched_round = round_number if round_number in rounds else rounds[0]
+            rank = (distance != 0, matched_round != round_number, distance)
+            if best is None or rank < best[0]:
+                best = (rank, word, matched_round, distance)
+
+        if best is None:
+            matched_words.append(None)
+            matched_rounds.append(None)
+            distances.append(None)
+            categories.append("intrusion")
+            continue
+        rank, word, matched_round, distance = best
+        matched_words.append(word)
+        matched_rounds.append(matched_round)
+        distances.append(distance)
+        key = (participant, round_number, word)
+        if matched_round != round_number:
+            categories.append("intrusion")
+        elif key in credited and not (distance == 0 and categories[credited[key]] == "near-miss"):
+            categories.append("duplicate")
+        else:
+            if key in credited:
+                categories[credited[key]] = "duplicate"
+            credited[key] = len(categories)
+            categories.append("correct" if distance == 0 else "near-miss")
+
+    scored = responses.copy()
+    scored["matched_word"] = matched_words
+    scored["matched_round"] = pd.array(matched_rounds, dtype="Int64")
+    scored["distance"] = pd.array(distances, dtype="Int64")
+    scored["category"] = pd.Categorical(categories, categories=CATEGORIES)
+    return scored
+
+
+def count_categories(scored):
+    """
+    Per participant and round: total_words (correct responses) plus the number
+    of near-misses, intrusions and duplicates.
+    """
+    columns = ["participant", "round", "total_words", "near_misses", "intrusions", "duplicates"]
+    if scored.empty:
+        return pd.DataFrame(columns=columns)
+    counts = scored.groupby(["participant", "round", "category"], observed=False).size().unstack("category")
+    counts = counts.reindex(columns=CATEGORIES, fill_value=0)
+    counts.columns = ["total_words", "near_misses", "intrusions", "duplicates"]
+    return counts.reset_index()
@@ -0,0 +1,216 @@
+"""
+Per-participant and cohort reports rendered from the analysis outputs.
+
+Each participant gets participants_results/participant_N/report/ with
+report.html (the rounds summary and trial tables) and two figures: time on
+task per round and recalled words by condition. The cohort report in
+participants_results/cohort_report/ shows the participants summary, the
+mirrored - normal effects and their distributions.
+
+The participant reports are only rendered on request (python data_analysis.py
+--reports): they cost about 0.2 s of CPU each. They are rendered in parallel
+on a process pool, every worker reusing one figure per plot, and a report is
+only rendered again when the content hash of its inputs (the participant's
+rows of the trials and rounds tables) changed. Figures need matplotlib (Agg
+backend); without it the reports contain the tables only.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = "participants_results"
+REPORT_DIR = "report"
+COHORT_DIR = os.path.join(RESULTS_DIR, "cohort_report")
+HASH_FILE = ".inputs_hash"
+REPORT_VERSION = "1"  # bump to re-render every report after changing the layout
+CONDITION_COLORS = {"normal": "#4c72b0", "mirrored": "#dd8452"}
+
+
+def _pyplot():
+    """matplotlib.pyplot on the Agg backend, or None if matplotlib is not installed."""
+    try:
+        import matplotlib
+    except ImportError:
+        return None
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# === HASHING ===
+
+def content_hashes(trials, rounds_df):
+    """SHA-1 per participant of their rows in trials and rounds_df (plus REPORT_VERSION)."""
+    tables = []
+    for table in (trials, rounds_df):
+        table = table.sort_values(["participant", "round"], kind="stable")
+        row_hashes = pd.util.hash_pandas_object(table, index=False).to_numpy()
+        participants, starts = np.unique(table["participant"].to_numpy(), return_index=True)
+        tables.append(dict(zip(participants.tolist(), np.split(row_hashes, starts[1:]))))
+    hashes = {}
+    for participant in sorted(set(tables[0]) | set(tables[1])):
+        digest = hashlib.sha1(REPORT_VERSION.encode("utf-8"))
+        for rows in tables:
+            digest.update(rows.get(participant, np.empty(0, dtype=np.uint64)).tobytes())
+            digest.update(b"|")
+        hashes[participant] = digest.hexdigest()
+    return hashes
+
+
+def _read_hash(folder):
+    try:
+        with open(os.path.join(folder, HASH_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write_hash(folder, content_hash):
+    with open(os.path.join(folder, HASH_FILE), "w", encoding="utf-8") as f:
+        f.write(content_hash)
+
+
+# === PARTICIPANT REPORTS ===
+
+_figures = {}  # name -> (figure, axis), reused for every participant a worker process renders
+_laid_out = set()
+
+
+def _figure(plt, name, figsize):
+    """The worker's figure for name, cleared for the next participant."""
+    if name not in _figures:
+        _figures[name] = plt.subplots(figsize=figsize)
+    figure, axis = _figures[name]
+    axis.clear()
+    return figure, axis
+
+
+def _save(figure, name, path):
+    # The layout only depends on the labels, so it is computed for the first participant only
+    if name not in _laid_out:
+        figure.tight_layout()
+        _laid_out.add(name)
+    figure.savefig(path, dpi=100)
+
+
+def _plot_time_on_task(plt, trials, path):
+    per_round = trials.groupby("round").agg(condition=("condition", "first"), time=("time_spent", "sum"))
+    figure, axis = _figure(plt, "time_on_task", (6, 3.5))
+    axis.bar(per_round.index, per_round["time"],
+             color=[CONDITION_COLORS.get(condition, "grey") for condition in per_round["condition"]])
+    axis.set_xlabel("Round")
+    axis.set_ylabel("Time on task (s)")
+    axis.set_xticks(per_round.index)
+    axis.legend(handles=[plt.Rectangle((0, 0), 1, 1, color=color) for color in CONDITION_COLORS.values()],
+                labels=list(CONDITION_COLORS), frameon=False)
+    _save(figure, "time_on_task", path)
+
+
+def _plot_recall_by_condition(plt, rounds, path):
+    means = rounds.groupby("condition")["total_words"].mean().reindex(list(CONDITION_COLORS))
+    figure, axis = _figure(plt, "recall_by_condition", (4, 3.5))
+    axis.bar(means.index, means.fillna(0), color=list(CONDITION_COLORS.values()))
+    for i, condition in enumerate(means.index):
+        words = rounds.loc[rounds["condition"] == condition, "total_words"]
+        axis.scatter([i] * len(words), words, color="black", s=12, zorder=3)
+    axis.set_ylabel("Recalled words per round")
+    _save(figure, "recall_by_condition", path)
+
+
+def render_participant_report(participant, trials, rounds, content_hash, results_dir=RESULTS_DIR):
+    """Write the report of one participant (runs in a worker process)."""
+    folder = os.path.join(results_dir, f"participant_{participant}", REPORT_DIR)
+    os.makedirs(folder, exist_ok=True)
+    plt = _pyplot()
+    figures = []
+    if plt is not None:
+        _plot_time_on_task(plt, trials, os.path.join(folder, "time_on_task.png"))
+        _plot_recall_by_condition(plt, rounds, os.path.join(folder, "recall_by_condition.png"))
+        figures = ["time_on_task.png", "recall_by_condition.png"]
+
+    rounds_table = rounds.drop(columns="participant").to_html(index=False)
+    trials_table = trials.drop(columns="participant").to_html(index=False)
+    _write_html(os.path.join(folder, "report.html"), f"Participant {participant}",
+                figures, [("Rounds", rounds_table), ("Trials", trials_table)])
+    _write_hash(folder, content_hash)
+    return participant
+
+
+def _write_html(path, title, figures, tables):
+    parts = [f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>{title}</title></head><body>",
+             f"<h1>{title}</h1>"]
+    parts += [f"<img src='{figure}' alt='{figure}'>" for figure in figures]
+    for heading, table in tables:
+        parts += [f"<h2>{heading}</h2>", table]
+    parts.append("</body></html>\n")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def write_participant_reports(trials, rounds_df, results_dir=RESULTS_DIR, workers=None, force=False):
+    """
+    Render the reports of every participant in rounds_df whose inputs changed
+    since their report was last rendered (all of them with force), across a
+    process pool. Returns the re-rendered participant numbers.
+    """
+    hashes = content_hashes(trials, rounds_df)
+    changed = [participant for participant, content_hash in hashes.items()
+               if force or _read_hash(os.path.join(results_dir, f"participant_{participant}", REPORT_DIR))
+               != content_hash]
+    if not changed:
+        return []
+
+    wanted = set(changed)
+    trials_of = {participant: group for participant, group in trials.groupby("participant", sort=False)
+                 if participant in wanted}
+    rounds_of = {participant: group for participant, group in rounds_df.groupby("participant", sort=False)
+                 if participant in wanted}
+    jobs = [(participant, trials_of.get(participant, trials.iloc[:0]),
+             rounds_of.get(participant, rounds_df.iloc[:0]), hashes[participant], results_dir)
+            for participant in changed]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [render_participant_report(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_participant_report, *zip(*jobs),
+                             chunksize=max(1, len(jobs) // (4 * workers))))
+
+
+# === COHORT REPORT ===
+
+def write_cohort_report(participants_df, effects_df, cohort_dir=COHORT_DIR, force=False):
+    """Render the cohort report unless its inputs are unchanged. Returns True if it was rendered."""
+    digest = hashlib.sha1(REPORT_VERSION.encode("utf-8"))
+    for table in (participants_df, effects_df):
+        digest.update(pd.util.hash_pandas_object(table, index=False).to_numpy().tobytes())
+    content_hash = digest.hexdigest()
+    if not force and _read_hash(cohort_dir) == content_hash:
+        return False
+
+    os.makedirs(cohort_dir, exist_ok=True)
+    plt = _pyplot()
+    figures = []
+    if plt is not None:
+        measures = [("avg_words_mirrored", "avg_words_normal", "Recalled words per round"),
+                    ("avg_mirrored_time(s)", "avg_normal_time(s)", "Time per round (s)")]
+        figure, axes = plt.subplots(1, 2, figsize=(9, 3.5))
+        for axis, (mirrored, normal, label) in zip(axes, measures):
+            differences = (participants_df[mirrored] - participants_df[normal]).dropna()
+            axis.hist(differences, bins=min(30, max(5, len(differences) // 5)), color="#888888")
+            axis.axvline(0, color="black", linewidth=1)
+            axis.set_xlabel(f"{label}: mirrored - normal")
+            axis.set_ylabel("Participants")
+        figure.tight_layout()
+        figure.savefig(os.path.join(cohort_dir, "differences.png"), dpi=100)
+        plt.close(figure)
+        figures.append("differences.png")
+
+    _write_html(os.path.join(cohort_dir, "report.html"), f"Cohort ({len(participants_df)} participants)",
+                figures, [("Effects (mirrored - normal)", effects_df.to_html(index=False)),
+                          ("Participants", participants_df.to_html(index=False))])
+    _write_hash(cohort_dir, content_hash)
+    return True
@@ -0,0 +1,341 @@
+"""
+Optional collector that gathers finished rounds from several experiment stations.
+
+The collector is an asyncio server on a local TCP socket. Stations send one JSON
+line per finished round ({"station", "participant", "round", "trials"}), per
+typed recall of a round ({..., "kind": "responses", "responses"}) and when all
+recall responses of a participant are sent ({..., "kind": "recall_complete"}),
+and get one JSON line back once it is safely in the central store. Incoming
+rounds are queued and written in batches (everything that queued up while
+the previous batch was written, in one SQLite transaction) into a ResultsStore.
+
+Every station numbers its participants on its own, so rounds are identified by
+station, the station's participant number and round. The first time a station
+participant arrives it gets a participant number in the central store: its own
+number if that is still free there, else the next free one (the mapping is kept
+in the store's collected table). A round received again with identical content
+is acknowledged as a duplicate and not written again, so stations can resend
+freely; a round received again with different content is rejected as a
+conflict and nothing is overwritten.
+
+Stations use an Outbox: every finished round is first spooled to a file in the
+station's results folder and only deleted once the collector acknowledged it.
+If the collector cannot be reached the files stay and are sent with the next
+round (or by flush() at the end of the session), so a station that goes
+offline loses nothing. A rejected round is kept in the spool as .conflict file.
+
+    python results_collector.py [port] [store path]   # run the collector
+
+InProcessCollector runs the same server on a background thread of the
+current process, for trying stations out on one machine.
+"""
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from results_store import STORE_PATH, ResultsStore
+
+DEFAULT_PORT = 8765
+KINDS = ("trials", "responses", "recall_complete")
+OUTBOX_DIR = os.path.join("participants_results", ".outbox")
+
+
+# === COLLECTOR ===
+
+class Collector:
+    """Receives rounds from stations and writes them to the store in batches."""
+
+    def __init__(self, store_path=STORE_PATH, batch_size=500):
+        self.store_path = store_path
+        self.batch_size = batch_size
+        self.received = 0
+        self.duplicates = 0
+        self.conflicts = 0
+        self.batches = 0
+        # SQLite connections belong to one thread: all store access goes through this one
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="collector-store")
+        self._store = None
+        self._collected = {}  # (station, station participant, kind, round) -> (participant, digest)
+        self._participants = {}  # (station, station participant) -> participant in the store
+        self._taken = set()  # participant numbers in use in the store
+        self._queue = None
+        self._server = None
+        self._writer = None
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Open the store and start listening; returns the (host, port) actually bound."""
+        loop = asyncio.get_running_loop()
+        self._store = await loop.run_in_executor(self._db, ResultsStore, self.store_path)
+        self._collected = await loop.run_in_executor(self._db, self._store.collected)
+        self._taken = await loop.run_in_executor(self._db, self._store.participant_ids)
+        self._participants = {key[:2]: participant for key, (participant, digest) in self._collected.items()}
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_batches())
+        self._server = await asyncio.start_server(self._handle_station, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """Stop accepting stations, write what is queued and close the store."""
+        self._server.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        self._writer.cancel()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._db, self._store.close)
+        self._db.shutdown()
+
+    async def serve_forever(self, host="0.0.0.0", port=DEFAULT_PORT):
+        address = await self.start(host, port)
+        print(f"Collecting results on {address[0]}:{address[1]} into {self.store_path}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_station(self, reader, writer):
+        """
+        One connection: any number of rounds. Lines are queued as fast as they
+        arrive; the replies go back in the same order once each round is stored.
+        """
+        replied = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    kind = message.get("kind", "trials")
+                    if kind not in KINDS:
+                        raise ValueError(f"unknown kind {kind!r}")
+                    key = (str(message.get("station", "")), int(message["participant"]), kind,
+                           int(message.get("round", 0)))
+                    payload = None if kind == "recall_complete" else list(message[kind])
+                except (ValueError, KeyError, TypeError, AttributeError) as error:
+                    stored, key = None, f"bad message: {error}"
+                else:
+                    stored = asyncio.get_running_loop().create_future()
+                    await self._queue.put((key, payload, stored))
+                replied = asyncio.create_task(self._reply(writer, replied, stored, key))
+            if replied is not None:
+                await replied
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # the station went away; whatever it did not get an answer for it will resend
+        finally:
+            writer.close()
+
+    async def _reply(self, writer, previous, stored, key):
+        if previous is not None:
+            await previous
+        if stored is None:
+            reply = {"ok": False, "error": key}
+        else:
+            try:
+                participant, duplicate = await stored
+                reply = {"ok": True, "participant": key[1], "round": key[3], "stored_as": participant,
+                         "duplicate": duplicate}
+            except Conflict as error:
+                reply = {"ok": False, "conflict": True, "error": str(error)}
+            except Exception as error:
+                reply = {"ok": False, "error": f"not stored: {error}"}
+        writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    async def _write_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Everything else already waiting goes into the same transaction
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            new_items, new_participants, outcome = [], [], []
+            for key, payload, stored in batch:
+                digest = _digest(payload)
+                if key in self._collected:
+                    participant, stored_digest = self._collected[key]
+                    if stored_digest == digest:
+                        outcome.append((stored, (participant, True)))
+                    else:
+                        station, station_participant, kind, round_number = key
+                        outcome.append((stored, Conflict(
+                            f"{kind} of participant {station_participant} round {round_number} of station "
+                            f"{station!r} were already stored with different content")))
+                    continue
+                if key[:2] not in self._participants:
+                    self._participants[key[:2]] = self._free_participant(key[1])
+                    self._taken.add(self._participants[key[:2]])
+                    new_participants.append(key[:2])
+                participant = self._participants[key[:2]]
+                self._collected[key] = (participant, digest)
+                new_items.append((*key, participant, digest, payload))
+                outcome.append((stored, (participant, False)))
+            try:
+                if new_items:
+                    await loop.run_in_executor(self._db, self._store.add_collected, new_items)
+                    self.batches += 1
+            except Exception as error:
+                # Nothing of this batch is stored: forget it so the stations' resends are written
+                for item in new_items:
+                    del self._collected[item[:4]]
+                for station_key in new_participants:
+                    self._taken.discard(self._participants.pop(station_key))
+                for key, payload, stored in batch:
+                    if not stored.done():
+                        stored.set_exception(error)
+            else:
+                self.received += len(new_items)
+                self.duplicates += sum(1 for stored, result in outcome if isinstance(result, tuple) and result[1])
+                self.conflicts += sum(1 for stored, result in outcome if isinstance(result, Conflict))
+                for stored, result in outcome:
+                    if stored.done():
+                        continue
+                    if isinstance(result, Conflict):
+                        stored.set_exception(result)
+                    else:
+                        stored.set_result(result)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _free_participant(self, station_participant):
+        """The station's own participant number if it is still free in the store, else the next free one."""
+        if station_participant not in self._taken:
+            return station_participant
+        return max(self._taken) + 1
+
+
+class Conflict(Exception):
+    """A round was received again with different content than the stored one."""
+
+
+def _digest(payload):
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class InProcessCollector:
+    """
+    A Collector running on its own event loop in a background thread.
+
+        with InProcessCollector("results.sqlite") as collector:
+            outbox = Outbox(collector.address, "outbox")
+    """
+
+    def __init__(self, store_path=STORE_PATH, port=0, **options):
+        self.collector = Collector(store_path, **options)
+        self.port = port
+        self.address = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="collector", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.address = asyncio.run_coroutine_threadsafe(
+            self.collector.start("127.0.0.1", self.port), self._loop).result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.collector.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+# === STATION SIDE ===
+
+class Outbox:
+    """
+    Spool of finished rounds waiting to be acknowledged by the collector.
+    push() spools the round and delivers on a background thread, so the
+    experiment never waits for the network; if the collector is unreachable
+    the round stays in the spool and goes out with a later push() or flush().
+    """
+
+    def __init__(self, address, outbox_dir=OUTBOX_DIR, station=None, timeout=5.0):
+        self.address = address
+        self.outbox_dir = outbox_dir
+        self.station = station or socket.gethostname()
+        self.timeout = timeout
+        self._sending = threading.Lock()
+        os.makedirs(outbox_dir, exist_ok=True)
+
+    def push(self, participant, round_number, trials):
+        """Spool one finished round and start delivering everything pending in the background."""
+        self._spool(f"participant_{participant}_round_{round_number}",
+                    {"participant": participant, "round": round_number, "trials": trials})
+
+    def push_responses(self, participant, round_number, responses):
+        """Spool the typed recall responses of one round."""
+        self._spool(f"participant_{participant}_round_{round_number}_responses",
+                    {"participant": participant, "round": round_number, "kind": "responses",
+                     "responses": responses})
+
+    def push_recall_complete(self, participant):
+        """Spool the note that every recall response of the participant has been pushed."""
+        self._spool(f"participant_{participant}_recall_complete",
+                    {"participant": participant, "kind": "recall_complete"})
+
+    def _spool(self, name, message):
+        path = os.path.join(self.outbox_dir, f"{name}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"station": self.station, **message}, f)
+        os.replace(path + ".tmp", path)
+        threading.Thread(target=self.flush, name="outbox", daemon=True).start()
+
+    def pending(self):
+        """Spooled files in the order they were pushed."""
+        paths = glob.glob(os.path.join(self.outbox_dir, "participant_*.json"))
+        return sorted(paths, key=lambda path: (os.stat(path).st_mtime_ns, path))
+
+    def flush(self):
+        """Send every spooled round over one connection; returns how many are still pending."""
+        with self._sending:
+            self._send(self.pending())
+            return len(self.pending())
+
+    def _send(self, paths):
+        if not paths:
+            return
+        try:
+            with socket.create_connection(self.address, timeout=self.timeout) as connection:
+                # Send all rounds first so the collector can store them in one batch
+                for path in paths:
+                    with open(path, "rb") as f:
+                        connection.sendall(f.read().rstrip(b"\n") + b"\n")
+                replies = connection.makefile("r", encoding="utf-8")
+                for path in paths:
+                    reply = json.loads(replies.readline() or "{}")
+                    if reply.get("ok"):
+                        os.remove(path)
+                    elif reply.get("conflict"):
+                        # Never resent, but kept for the experimenter to sort out
+                        os.replace(path, path + ".conflict")
+        except (OSError, ValueError):
+            pass  # collector offline: keep the files for the next attempt
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """"host:port" (or just "host") -> (host, port)."""
+    host, _, port = text.rpartition(":") if ":" in text else (text, "", "")
+    return host, int(port) if port else default_port
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    store_path = sys.argv[2] if len(sys.argv) > 2 else STORE_PATH
+    try:
+        asyncio.run(Collector(store_path).serve_forever(port=port))
+    except KeyboardInterrupt:
+        pass
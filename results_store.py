@@ -0,0 +1,236 @@
+"""
+Consolidated SQLite store for the results of all participants.
+
+One database file (results.sqlite in the working directory by default) holds
+every trial and every recall response, indexed on participant, round, condition
+and word, so analyses query a single file instead of re-reading hundreds of
+small CSV and Excel files. The experiment writes trials into it as rounds finish
+and data_analysis.import_results_tree() brings in folders written by hand or by
+older versions of the experiment.
+
+The database must be on a local disk: SQLite's file locking is not reliable on
+SMB/NFS shares, so it is kept out of participants_results, which several
+stations may share. Every station writes its own store; to combine stations use
+results_collector, or import the shared participants_results tree on the
+analysis machine.
+"""
+import os
+import sqlite3
+
+STORE_PATH = "results.sqlite"  # local to the station, never on a shared folder
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    participant     INTEGER PRIMARY KEY,
+    slot            INTEGER,
+    recall_complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS trials (
+    participant INTEGER NOT NULL,
+    round       INTEGER NOT NULL,
+    trial       INTEGER NOT NULL,
+    word        TEXT NOT NULL,
+    condition   TEXT NOT NULL,
+    skipped     INTEGER NOT NULL,
+    time_spent  REAL NOT NULL,
+    onset       REAL,
+    PRIMARY KEY (participant, round, trial)
+);
+CREATE TABLE IF NOT EXISTS responses (
+    participant INTEGER NOT NULL,
+    round       INTEGER NOT NULL,
+    position    INTEGER NOT NULL,
+    response    TEXT NOT NULL,
+    PRIMARY KEY (participant, round, position)
+);
+CREATE TABLE IF NOT EXISTS imports (
+    participant INTEGER PRIMARY KEY,
+    signature   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS collected (
+    station             TEXT NOT NULL,
+    station_participant INTEGER NOT NULL,
+    kind                TEXT NOT NULL,
+    round               INTEGER NOT NULL,
+    participant         INTEGER NOT NULL,
+    digest              TEXT NOT NULL,
+    PRIMARY KEY (station, station_participant, kind, round)
+);
+CREATE INDEX IF NOT EXISTS trials_round ON trials (round);
+CREATE INDEX IF NOT EXISTS trials_condition ON trials (condition);
+CREATE INDEX IF NOT EXISTS trials_word ON trials (word);
+CREATE INDEX IF NOT EXISTS responses_round ON responses (round);
+CREATE INDEX IF NOT EXISTS responses_response ON responses (response);
+"""
+
+
+class ResultsStore:
+    """Thin wrapper around the results database."""
+
+    def __init__(self, path=STORE_PATH, timeout=30.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Several stations may write at once: wait for the lock instead of failing
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.executescript(SCHEMA)
+        self.path = path
+
+    # --- writing ---
+
+    def add_participant(self, participant, slot=None):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO participants (participant, slot) VALUES (?, ?) "
+                "ON CONFLICT (participant) DO UPDATE SET slot = excluded.slot", (participant, slot))
+
+    def mark_recall_complete(self, participant):
+        """Flag that all recall responses of the participant are in the store."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO participants (participant, recall_complete) VALUES (?, 1) "
+                "ON CONFLICT (participant) DO UPDATE SET recall_complete = 1", (participant,))
+
+    def add_trials(self, participant, round_number, trials):
+        """Store the trials of one round (a rerun of the round replaces them)."""
+        self.add_rounds([(participant, round_number, trials)])
+
+    def add_rounds(self, rounds):
+        """
+        Store the trials of many rounds in one transaction.
+        rounds is a list of (participant, round_number, trials) with trials as in add_trials.
+        """
+        with self.connection:
+            for participant, round_number, trials in rounds:
+                self._write_trials(participant, round_number, trials)
+
+    def add_collected(self, items):
+        """
+        Store rounds received by a results_collector in one transaction.
+        items is a list of (station, station_participant, kind, round, participant, digest, payload):
+        the station's own participant number, the participant number in this store and the
+        payload of the kind: "trials" of a round as in add_trials, recall "responses" of a
+        round as in add_responses, or "recall_complete" (no payload, round 0).
+        """
+        with self.connection:
+            for station, station_participant, kind, round_number, participant, digest, payload in items:
+                if kind == "trials":
+                    self._write_trials(participant, round_number, payload)
+                elif kind == "responses":
+                    self._write_responses(participant, round_number, payload)
+                elif kind == "recall_complete":
+                    self.connection.execute(
+                        "INSERT INTO participants (participant, recall_complete) VALUES (?, 1) "
+                        "ON CONFLICT (participant) DO UPDATE SET recall_complete = 1", (participant,))
+                self.connection.execute("INSERT INTO collected VALUES (?, ?, ?, ?, ?, ?)",
+                                        (station, station_participant, kind, round_number, participant, digest))
+
+    def _write_trials(self, participant, round_number, trials):
+        rows = [(participant, round_number, trial_number, trial["word"], trial["condition"],
+                 int(bool(trial["skipped"])), float(trial["time_spent"]), trial.get("onset"))
+                for trial_number, trial in enumerate(trials, start=1)]
+        self.connection.execute("INSERT OR IGNORE INTO participants (participant) VALUES (?)", (participant,))
+        self.connection.execute("DELETE FROM trials WHERE participant = ? AND round = ?",
+                                (participant, round_number))
+        self.connection.executemany("INSERT INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _write_responses(self, participant, round_number, responses):
+        rows = [(participant, round_number, position, str(response))
+                for position, response in enumerate(responses, start=1)]
+        self.connection.execute("DELETE FROM responses WHERE participant = ? AND round = ?",
+                                (participant, round_number))
+        self.connection.executemany("INSERT INTO responses VALUES (?, ?, ?, ?)", rows)
+
+    def add_responses(self, participant, round_number, responses):
+        """Store the recall responses of one round, in the order they were given."""
+        with self.connection:
+            self._write_responses(participant, round_number, responses)
+
+    def replace_participant(self, participant, trials, responses, signature=None):
+        """
+        Replace everything stored for a participant in one transaction.
+        trials and responses are long DataFrames as returned by data_analysis.load_participant.
+        """
+        trial_rows = [(participant, int(row.round), int(row.trial), str(row.word), str(row.condition),
+                       int(bool(row.skipped)), float(row.time_spent), _optional_float(row, "onset"))
+                      for row in trials.itertuples(index=False)]
+        response_rows = []
+        for round_number, group in responses.groupby("round", sort=True):
+            response_rows.extend((participant, int(round_number), position, str(response))
+                                 for position, response in enumerate(group["response"], start=1))
+        with self.connection:
+            self.connection.execute("DELETE FROM trials WHERE participant = ?", (participant,))
+            self.connection.execute("DELETE FROM responses WHERE participant = ?", (participant,))
+            self.connection.executemany("INSERT INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?)", trial_rows)
+            self.connection.executemany("INSERT INTO responses VALUES (?, ?, ?, ?)", response_rows)
+            self.connection.execute(
+                "INSERT INTO participants (participant, recall_complete) VALUES (?, 1) "
+                "ON CONFLICT (participant) DO UPDATE SET recall_complete = 1", (participant,))
+            if signature is not None:
+                self.connection.execute("INSERT OR REPLACE INTO imports VALUES (?, ?)", (participant, signature))
+
+    # --- reading ---
+
+    def collected(self):
+        """(station, station_participant, kind, round) -> (participant, digest) of everything collected."""
+        return {tuple(row[:4]): tuple(row[4:]) for row in self.connection.execute("SELECT * FROM collected")}
+
+    def collected_participants(self):
+        """Participant numbers given out by a results_collector."""
+        return {participant for participant, in self.connection.execute(
+            "SELECT DISTINCT participant FROM collected")}
+
+    def participant_ids(self):
+        """Every participant number in the store."""
+        return {participant for participant, in self.connection.execute(
+            "SELECT participant FROM participants UNION SELECT participant FROM trials")}
+
+    def import_signatures(self):
+        return dict(self.connection.execute("SELECT participant, signature FROM imports"))
+
+    def complete_participants(self):
+        """Participants whose recall responses are in the store (ready for analysis)."""
+        return [participant for participant, in self.connection.execute(
+            "SELECT participant FROM participants WHERE recall_complete = 1 ORDER BY participant")]
+
+    def trials(self, complete_only=False):
+        """
+        Long trials table (participant, round, trial, word, condition, skipped, time_spent, onset).
+        With complete_only, only participants whose recall is in the store.
+        """
+        import pandas as pd
+
+        query = _select("trials", complete_only) + " ORDER BY participant, round, trial"
+        df = pd.read_sql_query(query, self.connection)
+        df["skipped"] = df["skipped"].astype(bool)
+        return df
+
+    def responses(self, complete_only=False):
+        """Long recall table (participant, round, position, response)."""
+        import pandas as pd
+
+        query = _select("responses", complete_only) + " ORDER BY participant, round, position"
+        return pd.read_sql_query(query, self.connection)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _select(table, complete_only):
+    if not complete_only:
+        return f"SELECT * FROM {table}"
+    return (f"SELECT {table}.* FROM {table} JOIN participants USING (participant) "
+            f"WHERE participants.recall_complete = 1")
+
+
+def _optional_float(row, name):
+    value = getattr(row, name, None)
+    if value is None or value != value:  # missing column or NaN
+        return None
+    return float(value)
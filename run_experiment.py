@@ -1,4 +1,21 @@
-from experiment_utils import *
+import time
 
+_started = time.perf_counter()
 
-main()
\ No newline at end of file
+import sys
+from experiment_utils import StartupTimer, main
+
+
+# python run_experiment.py --headless runs a whole session on a virtual clock
+# python run_experiment.py --resume N continues the interrupted session of participant N
+# python run_experiment.py --no-frame-timing skips recording the flip timestamps
+# python run_experiment.py --collector HOST:PORT also sends every finished round to a results_collector
+# python run_experiment.py --paper-recall has the words recalled on paper instead of typed in
+timer = StartupTimer(origin=_started)
+timer.add("import experiment_utils", time.perf_counter() - _started)
+backend = "headless" if "--headless" in sys.argv else "psychopy"
+resume = int(sys.argv[sys.argv.index("--resume") + 1]) if "--resume" in sys.argv else None
+collector = sys.argv[sys.argv.index("--collector") + 1] if "--collector" in sys.argv else None
+spec = {"typed_recall": False} if "--paper-recall" in sys.argv else None
+main(backend=backend, resume=resume, startup_timer=timer, frame_timing="--no-frame-timing" not in sys.argv,
+     spec=spec, collector=collector)
@@ -0,0 +1,136 @@
+"""
+Crash-safe, append-only session log.
+
+Every record (session header, trial, phase start/end) is written as one JSON line
+and flushed to the OS immediately, so an escape press or a crash of the
+experiment never loses a finished trial. fsync to disk happens in batches on a
+background thread so it never stalls a trial. read_session() rebuilds the state
+of a session from its log so it can be resumed at the next unfinished phase.
+"""
+import json
+import os
+import threading
+
+SESSION_LOG = "session_log.jsonl"
+
+
+class SessionLog:
+    """Append-only JSON-lines log with batched fsync on a background thread."""
+
+    def __init__(self, path, fsync_every=20, fsync_interval=1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._sync_loop, name="session-log-fsync", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """Append one record. Only the cheap write + flush happens on the caller's thread."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self._wake.set()
+
+    def sync(self):
+        """Ask the background thread to fsync now (e.g. at the end of a phase)."""
+        self._wake.set()
+
+    def close(self):
+        """Stop the fsync thread and fsync whatever is left."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        with self._lock:
+            self._fsync()
+            self._file.close()
+
+    def _sync_loop(self):
+        while not self._closed:
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            with self._lock:
+                if self._unsynced:
+                    self._file.flush()
+                    fd = self._file.fileno()
+                    self._unsynced = 0
+                else:
+                    fd = None
+            # The fsync itself runs outside the lock so writers never wait on the disk
+            if fd is not None:
+                try:
+                    os.fsync(fd)
+                except (OSError, ValueError):
+                    pass
+
+    def _fsync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(path):
+    """Read all complete records of a log (a torn last line from a crash is skipped)."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+class SessionState:
+    """What a session log says has happened so far."""
+
+    def __init__(self):
+        self.header = None
+        self.completed = set()
+        self.trials = {}
+
+    def is_done(self, round_number, phase):
+        return (round_number, phase) in self.completed
+
+    def next_phase(self, phases):
+        """First (round, phase) of the ordered phases that has not been completed."""
+        for step in phases:
+            if step not in self.completed:
+                return step
+        return None
+
+
+def read_session(path):
+    """
+    Rebuild a SessionState from a log.
+    Trials of an interrupted phase are dropped when that phase is started again.
+    """
+    state = SessionState()
+    for record in read_records(path):
+        kind = record.get("type")
+        if kind == "session":
+            state.header = record
+        elif kind == "phase_start":
+            if record["phase"] == "trials":
+                state.trials[record["round"]] = []
+        elif kind == "phase_end":
+            state.completed.add((record["round"], record["phase"]))
+        elif kind == "trial":
+            trial = {key: value for key, value in record.items() if key not in ("type", "round")}
+            state.trials.setdefault(record["round"], []).append(trial)
+    return state
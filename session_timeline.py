@@ -0,0 +1,142 @@
+"""
+Declarative session spec, compiled into a timeline before the session starts.
+
+SESSION_SPEC describes a session: timings, practice words, the recall mode and
+the fixed hold times around beeps and screens. compile_timeline() combines it with a
+participant's schedule (instructions, word sets, round conditions) into the
+list of phases experiment_utils.run_timeline() executes: the practice, then the
+trials, filler task and recall of every round, each with its trials and
+durations. The timeline is plain data, so it can be timed (estimate_duration)
+and its stimuli pre-rendered before the participant starts, and it runs
+unchanged on the real and the headless backend.
+"""
+
+SESSION_SPEC = {
+    "time_per_word": 28,
+    "time_per_break": 1.5,
+    "time_for_filler_task": 3,  # 60
+    "time_for_recall": 10,  # 60
+    "practice_words": ["sam"],
+    "typed_recall": True,  # recall typed in on screen; False for pen and paper
+}
+
+# Fixed parts of the phases (seconds)
+BEEP_HOLD_TIME = 0.4  # screen held after a timeout beep
+RECALL_BEEP_HOLD_TIME = 1.0  # blank screen after the recall beep
+RECALL_START_DELAY = 0.2  # after the participant starts the recall test
+FILLER_END_TIME = 3  # final score screen
+FILLER_MAX_OVERRUN = 0.03 + 0.4 + 0.05  # a shape started just before the end: ISI + response + feedback
+
+
+class Trial:
+    """One word presentation: shown for at most max_time, then a break."""
+
+    def __init__(self, word, condition, max_time, break_time):
+        self.word = word
+        self.condition = condition
+        self.max_time = max_time
+        self.break_time = break_time
+
+    def duration(self):
+        """(shortest, longest) duration: skipped at once, or beep after max_time."""
+        return self.break_time, self.max_time + BEEP_HOLD_TIME + self.break_time
+
+
+class Phase:
+    """
+    One phase of the session. round is 0 for the practice. Every phase starts
+    with a screen the participant moves on from with SPACE (self-paced, not
+    part of the duration).
+    """
+
+    def __init__(self, round, name, trials=(), min_duration=0.0, max_duration=0.0):
+        self.round = round
+        self.name = name
+        self.trials = list(trials)
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+
+    @property
+    def label(self):
+        return self.name if self.round == 0 else f"round {self.round} {self.name}"
+
+    @property
+    def words(self):
+        return [trial.word for trial in self.trials]
+
+    @property
+    def condition(self):
+        return self.trials[0].condition if self.trials else None
+
+    def __repr__(self):
+        return f"Phase({self.label!r}, {len(self.trials)} trials, {self.min_duration:.1f}-{self.max_duration:.1f} s)"
+
+
+class Timeline:
+    """The compiled phases of one session plus the spec they came from."""
+
+    def __init__(self, spec, phases):
+        self.spec = spec
+        self.phases = phases
+
+    @property
+    def timings(self):
+        """(time_per_word, time_per_break, time_for_filler_task, time_for_recall)."""
+        return (self.spec["time_per_word"], self.spec["time_per_break"],
+                self.spec["time_for_filler_task"], self.spec["time_for_recall"])
+
+    def pending(self, state=None):
+        """Phases still to run (all of them, or those the resumed session has not completed)."""
+        return [phase for phase in self.phases if state is None or not state.is_done(phase.round, phase.name)]
+
+    def word_lists(self, state=None):
+        """Words of every pending phase with trials, for pre-rendering."""
+        return [phase.words for phase in self.pending(state) if phase.trials]
+
+    def estimate_duration(self, state=None):
+        """
+        (shortest, longest, self_paced) for the pending phases: seconds if every
+        word is skipped at once / shown to its timeout, and the number of
+        self-paced start screens not included in either.
+        """
+        phases = self.pending(state)
+        return (sum(phase.min_duration for phase in phases),
+                sum(phase.max_duration for phase in phases),
+                len(phases))
+
+    def describe(self, state=None):
+        shortest, longest, self_paced = self.estimate_duration(state)
+        n_trials = sum(len(phase.trials) for phase in self.pending(state))
+        return (f"Timeline: {len(self.pending(state))} phases, {n_trials} trials, "
+                f"{shortest / 60:.1f}-{longest / 60:.1f} min plus {self_paced} self-paced screens")
+
+
+def _trials_phase(round, name, trials):
+    return Phase(round, name, trials,
+                 sum(trial.duration()[0] for trial in trials),
+                 sum(trial.duration()[1] for trial in trials))
+
+
+def compile_timeline(instructions, word_sets, round_conditions, spec=None):
+    """
+    Compile the session of one participant.
+    instructions maps each condition to its instruction text (the practice runs
+    the conditions in this order), word_sets and round_conditions give the words
+    and condition of every round.
+    """
+    spec = {**SESSION_SPEC, **(spec or {})}
+    time_per_word, time_per_break = spec["time_per_word"], spec["time_per_break"]
+    filler_time, recall_time = spec["time_for_filler_task"], spec["time_for_recall"]
+
+    practice = [Trial(word, condition, time_per_word, time_per_break)
+                for condition in instructions for word in spec["practice_words"]]
+    phases = [_trials_phase(0, "practice", practice)]
+    for round, (words, condition) in enumerate(zip(word_sets, round_conditions), start=1):
+        trials = [Trial(word, condition, time_per_word, time_per_break) for word in words]
+        phases.append(_trials_phase(round, "trials", trials))
+        phases.append(Phase(round, "filler",
+                            min_duration=filler_time + FILLER_END_TIME,
+                            max_duration=filler_time + FILLER_MAX_OVERRUN + FILLER_END_TIME))
+        recall = RECALL_START_DELAY + recall_time + RECALL_BEEP_HOLD_TIME
+        phases.append(Phase(round, "recall", min_duration=recall, max_duration=recall))
+    return Timeline(spec, phases)
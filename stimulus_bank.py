@@ -0,0 +1,124 @@
+"""
+Indexed stimulus bank and batch schedule compiler.
+
+The word file is parsed once into an index (memoized by the file's hash), and
+compile_schedules() turns it into word-to-round/condition assignments for many
+participants at once with NumPy. Participants are compiled in pairs (1-2, 3-4,
+...) that share the same words per round but have opposite condition orders,
+so every word is shown equally often in the normal and in the mirrored
+condition across each complete pair. Schedules are generated block by block
+from a fixed seed, so a participant's schedule does not depend on how many
+participants were compiled with it.
+"""
+import hashlib
+
+import numpy as np
+
+WORDLIST = "wordlist_gpt_nonsense.txt"
+CONDITIONS = ("normal", "mirrored")
+CONDITION_TEXT = {"normal": "Write normally the word",
+                  "mirrored": "Write mirrored the word"}
+SCHEDULE_SEED = 2024
+PAIRS_PER_BLOCK = 1024
+
+_banks = {}
+
+
+class StimulusBank:
+    """All words of a word file with a word -> index lookup."""
+
+    def __init__(self, words, file_hash):
+        self.words = np.asarray(words, dtype=object)
+        self.index = {word: i for i, word in enumerate(words)}
+        self.file_hash = file_hash
+
+    def __len__(self):
+        return len(self.words)
+
+    def lookup(self, indices):
+        """Word strings for an array of word indices (any shape)."""
+        return self.words[indices]
+
+
+def load_bank(filename=WORDLIST):
+    """
+    Parse filename into a StimulusBank (first word of each line, lowercase).
+    Banks are memoized by the file's SHA-256, so the file is only parsed again
+    after its content changed.
+    """
+    with open(filename, "rb") as f:
+        content = f.read()
+    file_hash = hashlib.sha256(content).hexdigest()
+    if file_hash not in _banks:
+        words = [line.split()[0] for line in content.decode("utf-8").lower().splitlines() if line.strip()]
+        _banks[file_hash] = StimulusBank(words, file_hash)
+    return _banks[file_hash]
+
+
+class Schedule:
+    """
+    Compiled schedules for participants first..first + n - 1.
+    words[i, r, k] is the word index of trial k in round r of participant i,
+    conditions[i, r] the condition index (into CONDITIONS) of that round.
+    """
+
+    def __init__(self, bank, first_participant, words, conditions):
+        self.bank = bank
+        self.first_participant = first_participant
+        self.words = words
+        self.conditions = conditions
+
+    def __len__(self):
+        return len(self.words)
+
+    def for_participant(self, participant_num):
+        """Return (instructions, word_sets, round_conditions) of one participant."""
+        i = participant_num - self.first_participant
+        round_conditions = [CONDITIONS[c] for c in self.conditions[i]]
+        instructions = {condition: CONDITION_TEXT[condition] for condition in dict.fromkeys(round_conditions)}
+        word_sets = [list(words) for words in self.bank.lookup(self.words[i])]
+        return instructions, word_sets, round_conditions
+
+
+def _compile_block(bank, block, number_of_words, number_of_rounds, seed):
+    """Schedules of the participants in one block of PAIRS_PER_BLOCK pairs."""
+    n_words = number_of_words * number_of_rounds
+    if n_words > len(bank):
+        raise ValueError(f"{n_words} words needed but the bank only has {len(bank)}")
+    rng = np.random.default_rng([seed, int(bank.file_hash[:8], 16), block])
+
+    # One random draw of words per pair, split into rounds
+    pair_words = rng.random((PAIRS_PER_BLOCK, len(bank))).argsort(axis=1)[:, :n_words]
+    pair_words = pair_words.reshape(PAIRS_PER_BLOCK, number_of_rounds, number_of_words)
+    words = np.repeat(pair_words, 2, axis=0)
+
+    # Each participant gets its own presentation order within every round
+    order = rng.random(words.shape).argsort(axis=2)
+    words = np.take_along_axis(words, order, axis=2).astype(np.int16)
+
+    # Odd participants start with normal, even ones with mirrored, then alternate
+    first = np.tile([0, 1], PAIRS_PER_BLOCK)
+    conditions = (first[:, None] + np.arange(number_of_rounds)[None, :]) % 2
+    return words, conditions.astype(np.int8)
+
+
+def compile_schedules(bank, n_participants, first_participant=1, number_of_words=5, number_of_rounds=6,
+                      seed=SCHEDULE_SEED):
+    """Compile the schedules of participants first_participant..first_participant + n - 1."""
+    last_participant = first_participant + n_participants - 1
+    participants_per_block = 2 * PAIRS_PER_BLOCK
+    first_block = (first_participant - 1) // participants_per_block
+    last_block = (last_participant - 1) // participants_per_block
+    blocks = [_compile_block(bank, block, number_of_words, number_of_rounds, seed)
+              for block in range(first_block, last_block + 1)]
+    words = np.concatenate([block_words for block_words, block_conditions in blocks])
+    conditions = np.concatenate([block_conditions for block_words, block_conditions in blocks])
+    start = first_participant - 1 - first_block * participants_per_block
+    return Schedule(bank, first_participant,
+                    words[start:start + n_participants], conditions[start:start + n_participants])
+
+
+def participant_schedule(participant_num, filename=WORDLIST, number_of_words=5, number_of_rounds=6):
+    """Return (instructions, word_sets, round_conditions) for one participant."""
+    schedule = compile_schedules(load_bank(filename), 1, participant_num, number_of_words, number_of_rounds)
+    return schedule.for_participant(participant_num)
@@ -0,0 +1,253 @@
+"""
+Synthetic participants_results trees for testing data_analysis.py at scale.
+
+Every participant gets the files a real session leaves behind:
+participant_N/round_1..6.csv (word, condition, skipped, time_spent, onset) with
+the words and conditions of the participant's compiled schedule
+(stimulus_bank), and participant_N_results.xlsx with the transcribed recall in
+the columns round1..round6. The model controls recall per condition, skips,
+typos, intrusions and missing files:
+
+- a skipped word was finished before its time ran out (time drawn from a gamma
+  distribution, capped at the time per word); otherwise it timed out
+- recalled words are written with one letter replaced at typo_rate, and bank
+  words that were not shown are added as intrusions
+- at missing_workbook_rate the workbook is not there yet (recall not
+  transcribed); at incomplete_rate the session stopped after a random round, so
+  the later round files and the workbook are missing. data_analysis skips both.
+
+The tree goes to synthetic/participants_results by default, away from the real
+results; run the analysis from synthetic/ to analyse it there. Participant
+folders that already exist are never overwritten unless asked for explicitly.
+
+Participants are generated in chunks: all trials of a chunk are drawn as NumPy
+arrays and written straight to disk, and chunks are spread over a process pool,
+so memory stays bounded by the chunk size whatever the number of participants.
+The workbooks are written directly as minimal xlsx files (pandas + openpyxl
+would take most of the time).
+
+    python synthetic_participants.py N [results dir] [--seed S] [--overwrite]
+    cd synthetic && python ../data_analysis.py
+"""
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from stimulus_bank import CONDITIONS, compile_schedules, load_bank
+
+RESULTS_DIR = os.path.join("synthetic", "participants_results")
+CHUNK_SIZE = 1_000
+TIME_PER_WORD = 28
+TIME_PER_BREAK = 1.5
+ROUND_GAP = 90.0  # filler task, recall and start screens between two rounds (s)
+
+DEFAULT_MODEL = {
+    "recall_normal": 0.45,          # probability a shown word is recalled, normal condition
+    "recall_mirrored": 0.55,        # same, mirrored condition
+    "skip_rate": 0.8,               # words finished before the time ran out
+    "time_shape": 2.0,              # gamma distribution of the time of skipped words
+    "time_scale": 4.0,
+    "mirrored_time_factor": 1.5,    # mirrored words take longer
+    "typo_rate": 0.1,               # recalled words with one wrong letter
+    "intrusion_rate": 0.1,          # words not shown, per round
+    "missing_workbook_rate": 0.0,   # participants without a results workbook
+    "incomplete_rate": 0.0,         # participants whose session stopped early
+}
+
+_LETTERS = np.array(list("abcdefghijklmnopqrstuvwxyz"), dtype=object)
+
+
+# === XLSX ===
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>')
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>')
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>')
+
+
+def write_xlsx(path, columns):
+    """
+    Write a workbook with one sheet: a header row with the column names and
+    below it the strings of every column (columns maps names to lists of
+    strings, which can differ in length). At most 26 columns.
+    """
+    letters = [chr(ord("A") + i) for i in range(len(columns))]
+    values = [[name] + list(cells) for name, cells in columns.items()]
+    rows = []
+    for row in range(max(len(cells) for cells in values)):
+        cells = "".join(f'<c r="{letter}{row + 1}" t="inlineStr"><is><t>{escape(column[row])}</t></is></c>'
+                        for letter, column in zip(letters, values) if row < len(column))
+        rows.append(f'<row r="{row + 1}">{cells}</row>')
+    sheet = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+             f'<sheetData>{"".join(rows)}</sheetData></worksheet>')
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as workbook:
+        workbook.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        workbook.writestr("_rels/.rels", _ROOT_RELS)
+        workbook.writestr("xl/workbook.xml", _WORKBOOK)
+        workbook.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        workbook.writestr("xl/worksheets/sheet1.xml", sheet)
+
+
+# === GENERATION ===
+
+def _typos(words, rng):
+    """Replace one random letter of every word with a random letter."""
+    positions = (rng.random(len(words)) * np.array([len(word) for word in words])).astype(int)
+    letters = rng.choice(_LETTERS, len(words))
+    return [word[:i] + letter + word[i + 1:] for word, i, letter in zip(words, positions, letters)]
+
+
+def generate_chunk(first_participant, n_participants, results_dir=RESULTS_DIR, seed=0, model=None):
+    """
+    Write the folders of participants first_participant..first_participant + n - 1.
+    Returns (participants written, workbooks written).
+    """
+    model = {**DEFAULT_MODEL, **(model or {})}
+    rng = np.random.default_rng([seed, first_participant])
+    bank = load_bank(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlist_gpt_nonsense.txt"))
+    schedule = compile_schedules(bank, n_participants, first_participant)
+    n, n_rounds, n_words = schedule.words.shape
+
+    # Trials: (participant, round, trial) arrays
+    words = bank.lookup(schedule.words)
+    mirrored = np.repeat(schedule.conditions[:, :, None], n_words, axis=2) == CONDITIONS.index("mirrored")
+    skipped = rng.random(words.shape) < model["skip_rate"]
+    times = rng.gamma(model["time_shape"], model["time_scale"], words.shape)
+    times = np.where(mirrored, times * model["mirrored_time_factor"], times)
+    time_spent = np.where(skipped, times.clip(0.2, TIME_PER_WORD), TIME_PER_WORD).round(3)
+    # Onsets: each word follows the previous one and its break; rounds are ROUND_GAP apart
+    durations = (time_spent + TIME_PER_BREAK).reshape(n, -1)
+    onsets = np.cumsum(durations, axis=1) - durations
+    onsets = (onsets.reshape(words.shape) + 10.0
+              + ROUND_GAP * np.arange(n_rounds)[None, :, None] + rng.random((n, 1, 1)) * 60).round(3)
+
+    recalled = rng.random(words.shape) < np.where(mirrored, model["recall_mirrored"], model["recall_normal"])
+    typo = rng.random(words.shape) < model["typo_rate"]
+    intrusions = rng.random((n, n_rounds)) < model["intrusion_rate"]
+    intrusion_words = bank.lookup(rng.integers(0, len(bank), (n, n_rounds)))
+    recall_order = rng.random(words.shape).argsort(axis=2)
+
+    # Missing files: rounds completed (n_rounds for finished sessions) and workbook present
+    rounds_done = np.where(rng.random(n) < model["incomplete_rate"], rng.integers(0, n_rounds, n), n_rounds)
+    has_workbook = (rounds_done == n_rounds) & (rng.random(n) >= model["missing_workbook_rate"])
+
+    # Recalled words with typos applied, in a random order per round
+    responses = words.copy()
+    responses[recalled & typo] = _typos(list(words[recalled & typo]), rng)
+    responses = np.take_along_axis(responses, recall_order, axis=2)
+    recalled = np.take_along_axis(recalled, recall_order, axis=2)
+
+    conditions = np.asarray(CONDITIONS, dtype=object)[schedule.conditions]
+    skipped_text = np.where(skipped, "True", "False")
+    time_spent, onsets = time_spent.tolist(), onsets.tolist()  # Python floats print like pandas does
+    workbooks = 0
+    for i in range(n):
+        participant = first_participant + i
+        folder = os.path.join(results_dir, f"participant_{participant}")
+        os.makedirs(folder, exist_ok=True)
+        for r in range(rounds_done[i]):
+            lines = ["word,condition,skipped,time_spent,onset"]
+            lines += [f"{words[i, r, k]},{conditions[i, r]},{skipped_text[i, r, k]},"
+                      f"{time_spent[i][r][k]!r},{onsets[i][r][k]!r}" for k in range(n_words)]
+            with open(os.path.join(folder, f"round_{r + 1}.csv"), "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        if has_workbook[i]:
+            columns = {}
+            for r in range(n_rounds):
+                column = list(responses[i, r][recalled[i, r]])
+                if intrusions[i, r]:
+                    column.append(intrusion_words[i, r])
+                columns[f"round{r + 1}"] = column
+            write_xlsx(os.path.join(folder, f"participant_{participant}_results.xlsx"), columns)
+            workbooks += 1
+    return n, workbooks
+
+
+def existing_participants(results_dir, first_participant, n_participants):
+    """Participant folders in results_dir with numbers first_participant..first_participant + n - 1."""
+    if not os.path.isdir(results_dir):
+        return []
+    last_participant = first_participant + n_participants - 1
+    existing = []
+    with os.scandir(results_dir) as entries:
+        for entry in entries:
+            match = re.fullmatch(r"participant_(\d+)", entry.name)
+            if match and first_participant <= int(match.group(1)) <= last_participant:
+                existing.append(int(match.group(1)))
+    return sorted(existing)
+
+
+def generate_tree(n_participants, results_dir=RESULTS_DIR, seed=0, model=None, first_participant=1,
+                  chunk_size=CHUNK_SIZE, workers=None, overwrite=False):
+    """
+    Write participants first_participant..first_participant + n - 1 into
+    results_dir, chunk by chunk across a process pool. Raises FileExistsError if
+    any of their folders exists already, unless overwrite.
+    Returns (participants written, workbooks written).
+    """
+    existing = existing_participants(results_dir, first_participant, n_participants)
+    if existing and not overwrite:
+        raise FileExistsError(f"{len(existing)} of the participant folders exist already in {results_dir} "
+                              f"(e.g. participant_{existing[0]}); not overwriting them")
+    os.makedirs(results_dir, exist_ok=True)
+    starts = list(range(first_participant, first_participant + n_participants, chunk_size))
+    sizes = [min(chunk_size, first_participant + n_participants - start) for start in starts]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(starts) <= 1:
+        results = [generate_chunk(start, size, results_dir, seed, model) for start, size in zip(starts, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(generate_chunk, starts, sizes, [results_dir] * len(starts),
+                                    [seed] * len(starts), [model] * len(starts)))
+    return sum(n for n, workbooks in results), sum(workbooks for n, workbooks in results)
+
+
+if __name__ == '__main__':
+    import time
+
+    args = [arg for arg in sys.argv[1:] if arg != "--overwrite"]
+    seed = 0
+    if "--seed" in args:
+        i = args.index("--seed")
+        seed = int(args[i + 1])
+        del args[i:i + 2]
+    n_participants = int(args[0]) if args else 100
+    results_dir = args[1] if len(args) > 1 else RESULTS_DIR
+    start = time.perf_counter()
+    try:
+        written, workbooks = generate_tree(n_participants, results_dir, seed, overwrite="--overwrite" in sys.argv)
+    except FileExistsError as error:
+        sys.exit(str(error))
+    print(f"Wrote {written} participants ({workbooks} with a results workbook) to {results_dir} "
+          f"in {time.perf_counter() - start:.1f} s")
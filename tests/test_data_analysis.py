@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+
+import data_analysis
+from results_collector import InProcessCollector, Outbox
+from results_store import ResultsStore
+
+
+def _round(participant, round_number):
+    condition = "normal" if round_number % 2 else "mirrored"
+    return [{"word": f"p{participant}r{round_number}w{i}", "condition": condition, "skipped": True,
+             "time_spent": 2.0 + i + participant, "onset": float(i)} for i in range(5)]
+
+
+def _collect(store_path, outbox_dir, station, participants):
+    with InProcessCollector(store_path) as collector:
+        outbox = Outbox(collector.address, outbox_dir, station=station)
+        for participant in participants:
+            for round_number in range(1, 7):
+                outbox.push(participant, round_number, _round(participant, round_number))
+                outbox.push_responses(participant, round_number,
+                                      [f"p{participant}r{round_number}w{i}" for i in range(participant)])
+            outbox.push_recall_complete(participant)
+        assert outbox.flush() == 0
+
+
+def test_analysis_runs_on_a_store_filled_by_the_collector(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _collect("results.sqlite", "outbox", "A", [1, 2, 3])
+
+    # No participants_results folder at all on the analysis machine
+    participants_df, effects_df = data_analysis.main()
+    assert list(participants_df["participant"]) == [1, 2, 3]
+    assert list(participants_df["avg_words_normal"]) == [1, 2, 3]
+    assert set(effects_df["measure"]) == {"words", "time(s)"}
+    assert not os.path.exists(os.path.join("participants_results", "participant_1"))
+
+    # An empty one does not make the per-participant outputs fail either
+    os.makedirs("participants_results/cohort_report", exist_ok=True)
+    data_analysis.main()
+    assert os.listdir("participants_results") == ["cohort_report"]
+
+
+def _write_folder(participant, source):
+    """A participant folder with typed recall files and the round files of participant source."""
+    folder = os.path.join("participants_results", f"participant_{participant}")
+    os.makedirs(folder)
+    for round_number in range(1, 7):
+        pd.DataFrame(_round(source, round_number)).to_csv(os.path.join(folder, f"round_{round_number}.csv"),
+                                                          index=False)
+        pd.DataFrame({"response": [f"p{source}r{round_number}w0"]}).to_csv(
+            os.path.join(folder, f"recall_round_{round_number}.csv"), index=False)
+    return folder
+
+
+def test_participant_reports_are_only_rendered_on_request(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folders = [_write_folder(participant, participant) for participant in (1, 2)]
+
+    data_analysis.main()
+    assert os.path.exists(os.path.join("participants_results", "cohort_report", "report.html"))
+    assert not any(os.path.exists(os.path.join(folder, "report")) for folder in folders)
+
+    data_analysis.main(participant_reports=True)
+    assert all(os.path.exists(os.path.join(folder, "report", "report.html")) for folder in folders)
+
+
+def test_folder_import_does_not_replace_collected_participants(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _collect("results.sqlite", "outbox", "A", [1])
+    _write_folder(1, 9)  # another station's participant_1
+
+    with ResultsStore("results.sqlite") as store:
+        assert data_analysis.import_results_tree(store, "participants_results", workers=1) == []
+        assert set(store.trials()["word"].str[:2]) == {"p1"}
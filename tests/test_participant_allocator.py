@@ -0,0 +1,51 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from participant_allocator import COUNTER_FILE, LOCK_FILE, FolderLock, allocate_participant
+
+
+def _allocate_many(results_dir, n):
+    return [allocate_participant(results_dir)[1] for _ in range(n)]
+
+
+def test_concurrent_processes_get_unique_ids(tmp_path):
+    results_dir = str(tmp_path / "participants_results")
+    with ProcessPoolExecutor(max_workers=8) as pool:
+        batches = list(pool.map(_allocate_many, [results_dir] * 8, [25] * 8))
+    ids = [participant for batch in batches for participant in batch]
+    assert sorted(ids) == list(range(1, 201))
+    assert all(os.path.isdir(os.path.join(results_dir, f"participant_{participant}")) for participant in ids)
+    assert not os.path.exists(os.path.join(results_dir, LOCK_FILE))
+
+
+def test_existing_folders_are_skipped(tmp_path):
+    results_dir = tmp_path / "participants_results"
+    (results_dir / "participant_1").mkdir(parents=True)
+    (results_dir / "participant_3").mkdir()
+    assert allocate_participant(str(results_dir))[1] == 4  # counter seeded from the highest folder
+    (results_dir / "participant_5").mkdir()  # made by hand after the counter exists
+    assert allocate_participant(str(results_dir))[1] == 6
+    assert (results_dir / COUNTER_FILE).read_text().strip() == "7"
+
+
+def test_stale_lock_is_broken(tmp_path):
+    results_dir = tmp_path / "participants_results"
+    results_dir.mkdir()
+    lock_path = results_dir / LOCK_FILE
+    lock_path.write_text("crashed-station 1234\n")
+    old = time.time() - 120
+    os.utime(lock_path, (old, old))
+    start = time.monotonic()
+    assert allocate_participant(str(results_dir))[1] == 1
+    assert time.monotonic() - start < 5
+    assert not lock_path.exists()
+
+
+def test_held_lock_times_out(tmp_path):
+    lock_path = str(tmp_path / LOCK_FILE)
+    with FolderLock(lock_path):
+        with pytest.raises(TimeoutError):
+            FolderLock(lock_path, timeout=0.1).acquire()
@@ -0,0 +1,16 @@
+import pytest
+
+from power_analysis import t_critical, t_two_sided_p
+
+
+@pytest.mark.parametrize("alpha, df, expected", [
+    (0.05, 1, 12.7062047), (0.05, 2, 4.3026527), (0.05, 3, 3.1824463),
+    (0.05, 30, 2.0422725), (0.01, 5, 4.0321430), (0.001, 1, 636.6192488),
+])
+def test_t_critical_matches_the_t_table(alpha, df, expected):
+    assert t_critical(alpha, df) == pytest.approx(expected, abs=1e-6)
+
+
+def test_p_value_of_the_critical_value_is_alpha():
+    for df in (1, 4, 17, 500):
+        assert t_two_sided_p(t_critical(0.05, df), df) == pytest.approx(0.05, rel=1e-9)
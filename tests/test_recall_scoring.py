@@ -0,0 +1,38 @@
+import pandas as pd
+
+from recall_scoring import count_categories, score_responses
+
+
+def _score(words, responses):
+    trials = pd.DataFrame({"participant": 1, "round": range(1, len(words) + 1), "word": words})
+    responses = pd.DataFrame([{"participant": 1, "round": round_number, "position": position, "response": response}
+                              for round_number, round_responses in responses.items()
+                              for position, response in enumerate(round_responses, start=1)])
+    return score_responses(trials, responses)
+
+
+def test_exact_word_of_another_round_is_an_intrusion_not_a_near_miss():
+    scored = _score(["talor", "valor"], {2: ["talor", "valor"]})
+    assert list(scored["category"]) == ["intrusion", "correct"]
+    counts = count_categories(scored).set_index("round")
+    assert counts.loc[2, "total_words"] == 1
+    assert counts.loc[2, "intrusions"] == 1
+
+
+def test_exact_response_takes_the_credit_from_an_earlier_near_miss():
+    scored = _score(["talor"], {1: ["talxr", "talor", "talor"]})
+    assert list(scored["category"]) == ["duplicate", "correct", "duplicate"]
+
+
+def test_near_miss_and_duplicate():
+    scored = _score(["melara"], {1: ["melarx", "melarx"]})
+    assert list(scored["category"]) == ["near-miss", "duplicate"]
+
+
+def test_allowed_misspelling_follows_the_length_of_the_word():
+    # 7-letter word: 1 edit, even when the misspelling itself has 8 letters
+    scored = _score(["melarat"], {1: ["melaratxx", "melaratx"]})
+    assert list(scored["category"]) == ["intrusion", "near-miss"]
+    # 8-letter word: 2 edits, even when the misspelling itself has 7 letters
+    scored = _score(["melarato"], {1: ["melxrto"]})
+    assert list(scored["category"]) == ["near-miss"]
@@ -0,0 +1,114 @@
+import os
+import socket
+
+from results_collector import InProcessCollector, Outbox
+from results_store import ResultsStore
+
+
+def _trials(word, n=5):
+    return [{"word": f"{word}{i}", "condition": "normal", "skipped": True, "time_spent": 1.5, "onset": float(i)}
+            for i in range(n)]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_spooled_rounds_are_written_in_batches(tmp_path):
+    store_path = str(tmp_path / "central.sqlite")
+    port = _free_port()
+    outbox = Outbox(("127.0.0.1", port), str(tmp_path / "outbox"), station="A", timeout=1.0)
+    for round_number in range(1, 7):
+        for participant in range(1, 11):
+            outbox.push(participant, round_number, _trials(f"p{participant}r{round_number}"))
+    assert outbox.flush() == 60  # collector not running yet
+
+    with InProcessCollector(store_path, port=port) as collector:
+        assert outbox.flush() == 0
+        assert collector.collector.received == 60
+        assert collector.collector.batches < 60
+    with ResultsStore(store_path) as store:
+        assert len(store.trials()) == 60 * 5
+
+
+def test_identical_resend_is_a_duplicate(tmp_path):
+    store_path = str(tmp_path / "central.sqlite")
+    with InProcessCollector(store_path) as collector:
+        outbox = Outbox(collector.address, str(tmp_path / "outbox"), station="A")
+        outbox.push(1, 1, _trials("a"))
+        assert outbox.flush() == 0
+        outbox.push(1, 1, _trials("a"))
+        assert outbox.flush() == 0
+        assert (collector.collector.received, collector.collector.duplicates) == (1, 1)
+    with ResultsStore(store_path) as store:
+        assert len(store.trials()) == 5
+
+
+def test_changed_resend_is_refused_and_kept(tmp_path):
+    store_path = str(tmp_path / "central.sqlite")
+    outbox_dir = tmp_path / "outbox"
+    with InProcessCollector(store_path) as collector:
+        outbox = Outbox(collector.address, str(outbox_dir), station="A")
+        outbox.push(1, 1, _trials("a"))
+        assert outbox.flush() == 0
+        outbox.push(1, 1, _trials("b"))
+        assert outbox.flush() == 0
+        assert collector.collector.conflicts == 1
+    assert os.listdir(outbox_dir) == ["participant_1_round_1.json.conflict"]
+    with ResultsStore(store_path) as store:
+        assert set(store.trials()["word"]) == {f"a{i}" for i in range(5)}
+
+
+def test_collector_offline_then_spool_is_resent(tmp_path):
+    store_path = str(tmp_path / "central.sqlite")
+    port = _free_port()
+    outbox = Outbox(("127.0.0.1", port), str(tmp_path / "outbox"), station="A", timeout=1.0)
+    outbox.push(1, 1, _trials("a"))
+    assert outbox.flush() == 1
+    with InProcessCollector(store_path, port=port):
+        outbox.push(1, 2, _trials("b"))  # delivers the spooled round 1 as well
+        assert outbox.flush() == 0
+    with ResultsStore(store_path) as store:
+        assert sorted(set(store.trials()["round"])) == [1, 2]
+
+
+def test_same_participant_number_on_two_stations(tmp_path):
+    store_path = str(tmp_path / "central.sqlite")
+    with InProcessCollector(store_path) as collector:
+        station_a = Outbox(collector.address, str(tmp_path / "a"), station="A")
+        station_b = Outbox(collector.address, str(tmp_path / "b"), station="B")
+        station_a.push(1, 1, _trials("a"))
+        assert station_a.flush() == 0
+        station_b.push(1, 1, _trials("b"))
+        assert station_b.flush() == 0
+        assert collector.collector.duplicates == 0
+    assert os.listdir(tmp_path / "b") == []
+    with ResultsStore(store_path) as store:
+        trials = store.trials()
+        assert set(trials.loc[trials["participant"] == 1, "word"]) == {f"a{i}" for i in range(5)}
+        assert set(trials.loc[trials["participant"] == 2, "word"]) == {f"b{i}" for i in range(5)}
+
+    # A restarted collector keeps the mapping: B's next round goes to the same participant
+    with InProcessCollector(store_path) as collector:
+        station_b = Outbox(collector.address, str(tmp_path / "b"), station="B")
+        station_b.push(1, 2, _trials("c"))
+        assert station_b.flush() == 0
+    with ResultsStore(store_path) as store:
+        trials = store.trials()
+        assert set(trials.loc[trials["round"] == 2, "participant"]) == {2}
+
+
+def test_typed_recall_and_completion_reach_the_central_store(tmp_path):
+    store_path = str(tmp_path / "central.sqlite")
+    with InProcessCollector(store_path) as collector:
+        outbox = Outbox(collector.address, str(tmp_path / "outbox"), station="A")
+        outbox.push(1, 1, _trials("a"))
+        outbox.push_responses(1, 1, ["a0", "a3x"])
+        outbox.push_recall_complete(1)
+        assert outbox.flush() == 0
+    with ResultsStore(store_path) as store:
+        assert store.complete_participants() == [1]
+        assert len(store.trials(complete_only=True)) == 5
+        assert list(store.responses(complete_only=True)["response"]) == ["a0", "a3x"]